@@ -1,58 +1,156 @@
 """Security Agent - Bug Hunting"""
+import asyncio
+import contextlib
+import os
 import requests
 import re
+import time
 from .base import Agent
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+SCAN_CONCURRENCY = int(os.getenv("SCAN_CONCURRENCY", "4"))   # requests in flight per host
+SCAN_DELAY = float(os.getenv("SCAN_DELAY", "0.05"))          # seconds between request starts per host
+SCAN_TIMEOUT = float(os.getenv("SCAN_TIMEOUT", "5"))
+SCAN_PATHS = os.getenv("SCAN_PATHS", "")                     # optional wordlist file, one path per line
+PAGE_CAP = 256 * 1024    # bytes of the main page kept for link extraction
+PROBE_CAP = 16 * 1024    # bytes read from a probe without Content-Length
+
+def load_paths(source):
+    """Path list from a list or a wordlist file (blank lines and # comments skipped)"""
+    if isinstance(source, str):
+        with open(source) as f:
+            source = [line.strip() for line in f]
+    return ["/" + p.lstrip("/") for p in source if p and not p.startswith("#")]
 
 class SecurityAgent(Agent):
     name = "security"
     
-    PATHS = ["/.env", "/.git/HEAD", "/robots.txt", "/api", "/admin", "/swagger.json", "/graphql"]
+    PATHS = ["/.env", "/.git/HEAD", "/robots.txt", "/api", "/admin", "/swagger.json", "/graphql",
+             "/.git/config", "/.svn/entries", "/.hg/hgrc", "/.DS_Store", "/.htaccess", "/.htpasswd",
+             "/.env.local", "/.env.production", "/config.json", "/config.yml", "/settings.py",
+             "/wp-config.php.bak", "/backup.zip", "/backup.sql", "/dump.sql", "/db.sqlite",
+             "/phpinfo.php", "/server-status", "/server-info", "/actuator", "/actuator/env",
+             "/actuator/health", "/metrics", "/debug", "/console", "/api/v1", "/api/v2",
+             "/api-docs", "/openapi.json", "/v2/api-docs", "/swagger-ui.html", "/graphiql",
+             "/login", "/administrator", "/wp-admin/", "/wp-login.php", "/phpmyadmin/",
+             "/sitemap.xml", "/crossdomain.xml", "/.well-known/security.txt", "/package.json",
+             "/composer.json", "/Dockerfile", "/docker-compose.yml", "/.travis.yml", "/web.config"]
+    
+    def __init__(self, brain=None, paths=None, concurrency=SCAN_CONCURRENCY, delay=SCAN_DELAY, timeout=SCAN_TIMEOUT):
+        super().__init__(brain)
+        self.paths = load_paths(paths or SCAN_PATHS or self.PATHS)
+        self.concurrency = concurrency
+        self.delay = delay
+        self.timeout = timeout
     
     def execute(self, task):
         target = task.split()[-1]
         return self.scan(target)
     
     def scan(self, target):
-        findings = []
-        base = f"https://{target}" if not target.startswith("http") else target
-        
-        # 1. Main page
-        try:
-            r = requests.get(base, timeout=10)
-            findings.append({"type": "INFO", "url": base, "status": r.status_code})
-            
-            # Check headers
-            headers = r.headers
-            if "X-Frame-Options" not in headers:
-                findings.append({"type": "MEDIUM", "vuln": "Missing X-Frame-Options"})
-            if "Content-Security-Policy" not in headers:
-                findings.append({"type": "LOW", "vuln": "Missing CSP"})
-        except Exception as e:
-            findings.append({"type": "ERROR", "error": str(e)})
-            return findings
-        
-        # 2. Path discovery
-        for p in self.PATHS:
-            try:
-                r = requests.get(f"{base}{p}", timeout=5, allow_redirects=False)
-                if r.status_code == 200:
-                    findings.append({"type": "FOUND", "url": f"{base}{p}", "size": len(r.text)})
-                elif r.status_code in [301, 302, 403]:
-                    findings.append({"type": "INTERESTING", "url": f"{base}{p}", "status": r.status_code})
-            except:
-                pass
-        
-        # 3. Extract links
-        try:
-            links = re.findall(r'href="([^"]*)"', r.text)[:20]
-            for link in links:
-                if "?" in link:
-                    findings.append({"type": "PARAM_URL", "url": link})
-        except:
-            pass
-        
+        if aiohttp is None:
+            return self._scan_sync(target)
+        return asyncio.run(self.scan_async(target))
+    
+    @staticmethod
+    def _base(target):
+        return f"https://{target}" if not target.startswith("http") else target
+    
+    def _report(self, base, status, headers, page, probes):
+        findings = [{"type": "INFO", "url": base, "status": status}]
+        if "X-Frame-Options" not in headers:
+            findings.append({"type": "MEDIUM", "vuln": "Missing X-Frame-Options"})
+        if "Content-Security-Policy" not in headers:
+            findings.append({"type": "LOW", "vuln": "Missing CSP"})
+        for p, (status, size) in zip(self.paths, probes):
+            if status == 200:
+                findings.append({"type": "FOUND", "url": f"{base}{p}", "size": size})
+            elif status in [301, 302, 403]:
+                findings.append({"type": "INTERESTING", "url": f"{base}{p}", "status": status})
+        links = re.findall(r'href="([^"]*)"', page.decode("utf-8", "ignore"))[:20]
+        for link in links:
+            if "?" in link:
+                findings.append({"type": "PARAM_URL", "url": link})
         return findings
     
+    # === Async engine: one pooled session per host, paced, bodies streamed and capped ===
+    
+    async def scan_async(self, target, budget=None):
+        """budget: optional semaphore shared between scans, caps requests in flight across all targets"""
+        base = self._base(target)
+        last = [0.0]
+        pace = asyncio.Lock()
+        # gate here rather than in the connector: time spent waiting for a pooled
+        # connection would count against the request timeout
+        slots = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit_per_host=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+    
+            async def fetch(url, cap, redirects):
+                async with slots, budget or contextlib.nullcontext():
+                    async with pace:
+                        wait = last[0] + self.delay - time.monotonic()
+                        if wait > 0:
+                            await asyncio.sleep(wait)
+                        last[0] = time.monotonic()
+                    async with session.get(url, allow_redirects=redirects) as r:
+                        length = r.content_length
+                        if length is not None and length <= cap:
+                            # short body: drain it so the connection goes back to the pool
+                            body = await r.read()
+                        else:
+                            body = b""
+                            while len(body) < cap:
+                                chunk = await r.content.read(cap - len(body))
+                                if not chunk:
+                                    break
+                                body += chunk
+                        return r.status, r.headers, body, length if length is not None else len(body)
+    
+            async def probe(p):
+                try:
+                    status, _, _, size = await fetch(f"{base}{p}", PROBE_CAP, False)
+                    return status, size
+                except Exception:
+                    return None, 0
+    
+            try:
+                status, headers, page, _ = await fetch(base, PAGE_CAP, True)
+            except Exception as e:
+                return [{"type": "ERROR", "error": str(e) or type(e).__name__}]
+            probes = await asyncio.gather(*[probe(p) for p in self.paths])
+        return self._report(base, status, headers, page, probes)
+    
+    def _scan_sync(self, target):
+        """Fallback without aiohttp: same requests, one keep-alive session, sequential"""
+        base = self._base(target)
+        with requests.Session() as session:
+    
+            def fetch(url, cap, redirects):
+                time.sleep(self.delay)
+                with session.get(url, timeout=self.timeout, allow_redirects=redirects, stream=True) as r:
+                    length = r.headers.get("Content-Length")
+                    length = int(length) if length and length.isdigit() else None
+                    body = r.raw.read(length if length is not None and length <= cap else cap, decode_content=True)
+                    return r.status_code, r.headers, body, length if length is not None else len(body)
+    
+            try:
+                status, headers, page, _ = fetch(base, PAGE_CAP, True)
+            except Exception as e:
+                return [{"type": "ERROR", "error": str(e)}]
+            probes = []
+            for p in self.paths:
+                try:
+                    status_p, _, _, size = fetch(f"{base}{p}", PROBE_CAP, False)
+                    probes.append((status_p, size))
+                except:
+                    probes.append((None, 0))
+        return self._report(base, status, headers, page, probes)
+    
     def evaluate(self, result):
         high = sum(1 for f in result if f.get("type") in ["HIGH", "FOUND"])
         med = sum(1 for f in result if f.get("type") == "MEDIUM")
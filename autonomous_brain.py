@@ -6,6 +6,7 @@ import os
 import json
 import requests
 from datetime import datetime
+from llm_client import LLMClient
 
 class AutonomousBrain:
     def __init__(self):
@@ -14,6 +15,7 @@ class AutonomousBrain:
         self.tg_token = os.getenv("TG_BOT_TOKEN")
         self.tg_chat = os.getenv("TG_CHAT_ID")
         self.memory_file = "brain_memory.json"
+        self.llm = LLMClient(self.api_url, self.api_key)
         self.load_memory()
     
     def load_memory(self):
@@ -29,19 +31,17 @@ class AutonomousBrain:
     
     def think(self, context):
         """Думает через LLM"""
-        r = requests.post(self.api_url, 
-            headers={"Authorization": f"Bearer {self.api_key}"},
-            json={
-                "model": os.getenv("MODEL", "deepseek/deepseek-chat"),
-                "messages": [
-                    {"role": "system", "content": f"""Ты автономный торговый агент.
+        r = self.llm.complete({
+            "model": os.getenv("MODEL", "deepseek/deepseek-chat"),
+            "messages": [
+                {"role": "system", "content": f"""Ты автономный торговый агент.
 Твоя память: {json.dumps(self.memory['lessons'][-5:], ensure_ascii=False)}
 Твоя точность: {self.memory['accuracy']}%
 Анализируй и учись на ошибках."""},
-                    {"role": "user", "content": context}
-                ]
-            })
-        return r.json()["choices"][0]["message"]["content"]
+                {"role": "user", "content": context}
+            ]
+        })
+        return r["choices"][0]["message"]["content"]
     
     def learn(self, trade_result):
         """Учится на результате"""
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+BACKTEST - правила выхода trend_hunter на history.db
+Вход: close пересекает MA снизу вверх. Выход: should_hold() + стопы по тирам.
+Все входы всех тикеров считаются одной матрицей, сетка параметров — в пуле процессов.
+"""
+
+import itertools
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from position_sizer import TIER1, TIER2, TIER3
+
+HISTORY_DB = "history.db"
+HORIZON = 250           # максимум дней в позиции
+
+GRID = {
+    "ma": [5, 10, 20],
+    "stops": [(-3.0, -5.0, -7.0), (-2.0, -4.0, -6.0), (-5.0, -7.0, -10.0)],
+    "days_held": [2, 3, 5],
+}
+
+def load_prices(db=HISTORY_DB):
+    """Матрица close (тикеры x даты), NaN где торгов не было"""
+    conn = sqlite3.connect(db)
+    rows = conn.execute("SELECT ticker, date, close FROM prices ORDER BY ticker, date").fetchall()
+    conn.close()
+    tickers = sorted({r[0] for r in rows})
+    dates = sorted({r[1] for r in rows})
+    ti = {t: i for i, t in enumerate(tickers)}
+    di = {d: i for i, d in enumerate(dates)}
+    close = np.full((len(tickers), len(dates)), np.nan)
+    close[[ti[r[0]] for r in rows], [di[r[1]] for r in rows]] = [r[2] for r in rows]
+    return tickers, dates, close
+
+def moving_average(close, window):
+    """MA по последним window торговым дням тикера (пропуски не считаются)"""
+    ma = np.full(close.shape, np.nan)
+    for i, row in enumerate(close):
+        idx = np.flatnonzero(~np.isnan(row))
+        if len(idx) < window:
+            continue
+        csum = np.concatenate([[0.0], np.cumsum(row[idx])])
+        ma[i, idx[window - 1:]] = (csum[window:] - csum[:-window]) / window
+    return ma
+
+def stop_levels(tickers, stops):
+    t1, t2, t3 = stops
+    return np.array([t1 if t in TIER1 else t2 if t in TIER2 else t3 for t in tickers])
+
+def simulate(tickers, close, ma_window=10, stops=(-3.0, -5.0, -7.0), days_held=3):
+    """Сделки по всем тикерам: [(тикер, вход, выход, pnl %)]"""
+    ma = moving_average(close, ma_window)
+    above = close > ma
+    # предыдущий торговый день тикера (в общем календаре бывают пропуски)
+    traded_day = ~np.isnan(close)
+    last = np.maximum.accumulate(np.where(traded_day, np.arange(close.shape[1]), -1), axis=1)
+    prev = np.concatenate([np.full((len(close), 1), -1), last[:, :-1]], axis=1)
+    rows = np.arange(len(close))[:, None]
+    prev_ok = (prev >= 0) & ~np.isnan(ma[rows, np.maximum(prev, 0)])
+    cross = traded_day & above & prev_ok & ~above[rows, np.maximum(prev, 0)]
+    ti, di = np.nonzero(cross)
+    if not len(ti):
+        return np.empty((0, 4))
+    # окно будущих дней для каждого кандидата на вход: E x HORIZON
+    steps = np.arange(1, HORIZON + 1)
+    idx = np.minimum(di[:, None] + steps, close.shape[1] - 1)
+    valid = di[:, None] + steps < close.shape[1]
+    price = close[ti[:, None], idx]
+    ma_t = ma[ti[:, None], idx]
+    entry = close[ti, di]
+    profit = (price - entry[:, None]) / entry[:, None] * 100
+    stop = stop_levels(tickers, stops)[ti]
+    traded = valid & ~np.isnan(price)
+    held = np.cumsum(traded, axis=1)
+    exit_ = traded & ((profit < stop[:, None]) | np.isnan(ma_t) | ((price < ma_t) & (held > days_held)))
+    # без сигнала выхода закрываем по последней доступной цене окна
+    last_traded = HORIZON - 1 - np.argmax(traded[:, ::-1], axis=1)
+    first = np.where(exit_.any(axis=1), exit_.argmax(axis=1), last_traded)
+    exit_day = idx[np.arange(len(ti)), first]
+    pnl = profit[np.arange(len(ti)), first]
+    ok = traded.any(axis=1)
+    # одна позиция на тикер: пропускаем входы, пока открыта предыдущая
+    trades, busy_until = [], {}
+    for k in np.flatnonzero(ok):
+        t = ti[k]
+        if di[k] <= busy_until.get(t, -1):
+            continue
+        busy_until[t] = exit_day[k]
+        trades.append((t, di[k], exit_day[k], pnl[k]))
+    return np.array(trades, dtype=float).reshape(-1, 4)
+
+def report(trades):
+    if not len(trades):
+        return {"trades": 0, "pnl": 0.0, "win_rate": 0.0, "max_drawdown": 0.0, "position_days": 0}
+    order = np.argsort(trades[:, 2], kind="stable")
+    equity = np.cumsum(trades[order, 3])
+    drawdown = np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:] - equity
+    return {
+        "trades": len(trades),
+        "pnl": round(float(trades[:, 3].sum()), 2),
+        "win_rate": round(float((trades[:, 3] > 0).mean() * 100), 1),
+        "max_drawdown": round(float(drawdown.max()), 2),
+        "position_days": int((trades[:, 2] - trades[:, 1]).sum()),
+    }
+
+_data = {}
+
+def _init_worker(db):
+    tickers, _, close = load_prices(db)
+    _data.update(tickers=tickers, close=close)
+
+def _run(params):
+    ma_window, stops, days_held = params
+    trades = simulate(_data["tickers"], _data["close"], ma_window, stops, days_held)
+    return dict(report(trades), ma=ma_window, stops=stops, days_held=days_held)
+
+def grid_search(db=HISTORY_DB, grid=GRID, workers=None):
+    combos = list(itertools.product(grid["ma"], grid["stops"], grid["days_held"]))
+    start = time.time()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(db,)) as pool:
+        results = list(pool.map(_run, combos))
+    elapsed = time.time() - start
+    days = sum(r["position_days"] for r in results)
+    return sorted(results, key=lambda r: -r["pnl"]), {
+        "runs": len(combos), "seconds": round(elapsed, 2),
+        "position_days_per_sec": round(days / elapsed) if elapsed else 0,
+    }
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    results, stats = grid_search(workers=workers)
+    print(f"{'MA':>3} {'stops':>20} {'days':>4} {'trades':>6} {'pnl%':>8} {'win%':>5} {'maxDD':>7}")
+    for r in results[:10]:
+        print(f"{r['ma']:>3} {str(r['stops']):>20} {r['days_held']:>4} {r['trades']:>6} "
+              f"{r['pnl']:>8} {r['win_rate']:>5} {r['max_drawdown']:>7}")
+    print(f"Runs: {stats['runs']} in {stats['seconds']} s, {stats['position_days_per_sec']} position-days/sec")
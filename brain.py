@@ -1,13 +1,53 @@
 """HYDRA Brain - Memory System"""
+import atexit
+import gzip
+import io
+import os
+import shutil
 import sqlite3
 import json
-from datetime import datetime
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from config import DB_PATH
 
+FLUSH_ROWS = 500      # write-behind: commit every N rows...
+FLUSH_MS = 200        # ...or every T milliseconds, whichever comes first
+WRITE_RETRIES = 5     # failed commits of one batch before the writer gives up
+CACHE_SIZE = 1024     # knowledge keys kept decoded in memory
+RETAIN_DAYS = 30      # raw task rows older than this move to the archive
+ARCHIVE_ROWS = 50000  # rows archived per transaction
+
+_MISSING = object()
+
 class Brain:
-    def __init__(self):
-        self.db = sqlite3.connect(DB_PATH)
+    def __init__(self, db_path=None, buffered=False, batch=FLUSH_ROWS, interval=FLUSH_MS / 1000,
+                 cache_size=CACHE_SIZE, compress_min=None):
+        """compress_min: store knowledge values whose JSON exceeds this many bytes as zlib BLOBs"""
+        self.path = str(db_path or DB_PATH)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
         self._init()
+        self.cache = OrderedDict()      # key -> JSON text (or _MISSING), decoded per recall
+        self.cache_lock = threading.Lock()
+        self.cache_size = cache_size
+        self.compress_min = compress_min
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+        self.buffered = buffered
+        if buffered:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.batch = batch
+            self.interval = interval
+            self.pending = []           # (kind, row) not yet committed, oldest first
+            self.cond = threading.Condition()
+            self.closing = False
+            self.hurry = False
+            self.error = None           # set when the writer gave up; raised from flush()
+            self.writer = threading.Thread(target=self._writer, daemon=True)
+            self.writer.start()
+            atexit.register(self.close)
     
     def _init(self):
         self.db.executescript("""
@@ -25,10 +65,152 @@ class Brain:
                 value TEXT,
                 updated TIMESTAMP
             );
+            CREATE INDEX IF NOT EXISTS idx_tasks_agent_ts ON tasks(agent, ts);
+            CREATE INDEX IF NOT EXISTS idx_tasks_ts ON tasks(ts);
+            CREATE TABLE IF NOT EXISTS archive_segments (
+                name TEXT PRIMARY KEY,
+                first_id INTEGER,
+                last_id INTEGER,
+                first_ts TIMESTAMP,
+                last_ts TIMESTAMP,
+                rows INTEGER,
+                bytes INTEGER
+            );
         """)
         self.db.commit()
+        self._init_aggregates()
+    
+    # === Aggregates ===
+    # Per-agent totals and hour/day rollups, maintained by an insert trigger so every
+    # writer (direct, write-behind, other processes) keeps them current. Deleting raw
+    # task rows leaves the aggregates untouched.
+    
+    ROLLUPS = {"hour": "%Y-%m-%d %H:00:00", "day": "%Y-%m-%d"}
+    
+    def _init_aggregates(self):
+        fresh = not self.db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='agent_stats'").fetchone()
+        with self.db:
+            self.db.execute("""CREATE TABLE IF NOT EXISTS agent_stats (
+                agent TEXT PRIMARY KEY, tasks INTEGER, scored INTEGER, score_sum REAL,
+                score_min REAL, score_max REAL, first_ts TIMESTAMP, last_ts TIMESTAMP)""")
+            self.db.execute("""CREATE TABLE IF NOT EXISTS agent_rollups (
+                agent TEXT, period TEXT, start TIMESTAMP, tasks INTEGER, scored INTEGER, score_sum REAL,
+                score_min REAL, score_max REAL, PRIMARY KEY (agent, period, start))""")
+            upserts = ["""INSERT INTO agent_stats VALUES (NEW.agent, 1, NEW.score IS NOT NULL,
+                    COALESCE(NEW.score, 0), NEW.score, NEW.score, NEW.ts, NEW.ts)
+                ON CONFLICT(agent) DO UPDATE SET tasks = tasks + 1, scored = scored + excluded.scored,
+                    score_sum = score_sum + excluded.score_sum,
+                    score_min = MIN(COALESCE(score_min, excluded.score_min), COALESCE(excluded.score_min, score_min)),
+                    score_max = MAX(COALESCE(score_max, excluded.score_max), COALESCE(excluded.score_max, score_max)),
+                    first_ts = MIN(first_ts, excluded.first_ts), last_ts = MAX(last_ts, excluded.last_ts);"""]
+            for period, fmt in self.ROLLUPS.items():
+                upserts.append(f"""INSERT INTO agent_rollups VALUES (NEW.agent, '{period}', strftime('{fmt}', NEW.ts),
+                    1, NEW.score IS NOT NULL, COALESCE(NEW.score, 0), NEW.score, NEW.score)
+                ON CONFLICT(agent, period, start) DO UPDATE SET tasks = tasks + 1, scored = scored + excluded.scored,
+                    score_sum = score_sum + excluded.score_sum,
+                    score_min = MIN(COALESCE(score_min, excluded.score_min), COALESCE(excluded.score_min, score_min)),
+                    score_max = MAX(COALESCE(score_max, excluded.score_max), COALESCE(excluded.score_max, score_max));""")
+            self.db.execute("CREATE TRIGGER IF NOT EXISTS tasks_aggregate AFTER INSERT ON tasks BEGIN "
+                            + " ".join(upserts) + " END")
+            if fresh:
+                # one-time backfill from the rows already in tasks
+                self.db.execute("""INSERT INTO agent_stats SELECT agent, COUNT(*), COUNT(score), COALESCE(SUM(score), 0),
+                    MIN(score), MAX(score), MIN(ts), MAX(ts) FROM tasks GROUP BY agent""")
+                for period, fmt in self.ROLLUPS.items():
+                    self.db.execute(f"""INSERT INTO agent_rollups SELECT agent, '{period}', strftime('{fmt}', ts),
+                        COUNT(*), COUNT(score), COALESCE(SUM(score), 0), MIN(score), MAX(score)
+                        FROM tasks GROUP BY agent, strftime('{fmt}', ts)""")
+    
+    # === Write-behind ===
+    
+    def _enqueue(self, kind, row):
+        with self.cond:
+            self.pending.append((kind, row))
+            if len(self.pending) >= self.batch:
+                self.cond.notify_all()
+    
+    def _writer(self):
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA synchronous=NORMAL")
+        failures = 0
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: len(self.pending) >= self.batch or self.hurry or self.closing,
+                                   self.interval)
+                batch = self.pending[:self.batch]
+                if not batch:
+                    self.hurry = False
+                    self.cond.notify_all()
+                    if self.closing:
+                        break
+                    continue
+            try:
+                tasks = [row for kind, row in batch if kind == "task"]
+                knowledge = [row for kind, row in batch if kind == "knowledge"]
+                if tasks:
+                    db.executemany("INSERT INTO tasks (agent, task, result, score, ts) VALUES (?,?,?,?,?)", tasks)
+                if knowledge:
+                    db.executemany("INSERT OR REPLACE INTO knowledge (key, value, updated) VALUES (?,?,?)", knowledge)
+                # commit and dequeue under one lock so readers never see a row twice
+                with self.cond:
+                    db.commit()
+                    del self.pending[:len(batch)]
+                    self.cond.notify_all()
+                failures = 0
+            except sqlite3.Error as e:
+                db.rollback()
+                failures += 1
+                if failures >= WRITE_RETRIES:
+                    # locked/corrupt/full database: stop retrying, keep the rows pending for inspection
+                    with self.cond:
+                        self.error = e
+                        self.cond.notify_all()
+                    break
+                time.sleep(self.interval * 2 ** (failures - 1))
+        db.close()
+    
+    def flush(self):
+        """Block until every pending write is committed and checkpointed to the main file.
+        Raises the writer's sqlite3.Error if it gave up after WRITE_RETRIES failed commits"""
+        if not self.buffered:
+            return
+        with self.cond:
+            self.hurry = True
+            self.cond.notify_all()
+            while self.pending and self.writer.is_alive():
+                self.cond.wait(self.interval)
+            if self.error is not None:
+                raise self.error
+        self.db.execute("PRAGMA wal_checkpoint(FULL)")
+    
+    def close(self):
+        if self.buffered and not self.closing:
+            try:
+                self.flush()
+            finally:
+                with self.cond:
+                    self.closing = True
+                    self.cond.notify_all()
+                self.writer.join()
+            self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def _pending(self, kind):
+        return [row for k, row in self.pending if k == kind]
+    
+    # === API ===
     
     def save_task(self, agent, task, result, score=0.5):
+        if self.buffered:
+            ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+            self._enqueue("task", (agent, task, json.dumps(result), score, ts))
+            return
         self.db.execute(
             "INSERT INTO tasks (agent, task, result, score) VALUES (?,?,?,?)",
             (agent, task, json.dumps(result), score)
@@ -36,32 +218,295 @@ class Brain:
         self.db.commit()
     
     def get_history(self, agent=None, limit=10):
+        if not self.buffered:
+            return self._history(agent, limit)
+        with self.cond:
+            rows = self._history(agent, limit, ts=True)
+            pending = self._pending("task")
+        # pending rows are newer than anything committed; keep them first on equal ts
+        if agent:
+            extra = [(t, r, s, ts) for a, t, r, s, ts in reversed(pending) if a == agent]
+        else:
+            extra = [(a, t, s, ts) for a, t, r, s, ts in reversed(pending)]
+        merged = sorted(extra[:limit] + rows, key=lambda r: r[-1], reverse=True)
+        return [r[:-1] for r in merged[:limit]]
+    
+    def _history(self, agent, limit, ts=False):
+        extra = ", ts" if ts else ""
         if agent:
             rows = self.db.execute(
-                "SELECT task, result, score FROM tasks WHERE agent=? ORDER BY ts DESC LIMIT ?",
+                f"SELECT task, result, score{extra} FROM tasks WHERE agent=? ORDER BY ts DESC LIMIT ?",
                 (agent, limit)
             ).fetchall()
         else:
             rows = self.db.execute(
-                "SELECT agent, task, score FROM tasks ORDER BY ts DESC LIMIT ?",
+                f"SELECT agent, task, score{extra} FROM tasks ORDER BY ts DESC LIMIT ?",
                 (limit,)
             ).fetchall()
         return rows
     
+    # === Knowledge ===
+    # Read-through LRU over the knowledge table; writes go to the cache and the table together.
+    # The cache holds JSON text, so every recall() returns a fresh object with the same types
+    # (lists for tuples, string keys) as a read from the table.
+    
+    def _encode(self, text):
+        if self.compress_min is not None and len(text) > self.compress_min:
+            return zlib.compress(text.encode())
+        return text
+    
+    @staticmethod
+    def _decode(raw):
+        return zlib.decompress(raw).decode() if isinstance(raw, bytes) else raw
+    
+    def _cache_put(self, key, text):
+        """Caller holds cache_lock"""
+        self.cache[key] = text
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+            self.counters["evictions"] += 1
+    
     def remember(self, key, value):
-        self.db.execute(
-            "INSERT OR REPLACE INTO knowledge (key, value, updated) VALUES (?,?,?)",
-            (key, json.dumps(value), datetime.now().isoformat())
-        )
-        self.db.commit()
+        self.remember_many({key: value})
+    
+    def remember_many(self, mapping):
+        now = datetime.now().isoformat()
+        texts = {key: json.dumps(value) for key, value in mapping.items()}
+        rows = [(key, self._encode(text), now) for key, text in texts.items()]
+        if self.buffered:
+            for row in rows:
+                self._enqueue("knowledge", row)
+        else:
+            self.db.executemany("INSERT OR REPLACE INTO knowledge (key, value, updated) VALUES (?,?,?)", rows)
+            self.db.commit()
+        with self.cache_lock:
+            for key, text in texts.items():
+                self._cache_put(key, text)
     
     def recall(self, key):
-        row = self.db.execute("SELECT value FROM knowledge WHERE key=?", (key,)).fetchone()
-        return json.loads(row[0]) if row else None
+        return self.recall_many([key])[key]
+    
+    def recall_many(self, keys):
+        """{key: value} for every key, None where nothing is stored; one query for all cache misses"""
+        out, todo = {}, []
+        with self.cache_lock:
+            for key in dict.fromkeys(keys):
+                if key in self.cache:
+                    self.cache.move_to_end(key)
+                    out[key] = self.cache[key]
+                    self.counters["hits"] += 1
+                else:
+                    todo.append(key)
+            self.counters["misses"] += len(todo)
+        out = {key: None if text is _MISSING else json.loads(text) for key, text in out.items()}
+        if not todo:
+            return out
+        found = {}
+        if self.buffered:
+            wanted = set(todo)
+            with self.cond:
+                pending = {k: v for k, v, _ in self._pending("knowledge") if k in wanted}
+                found = self._fetch_knowledge([k for k in todo if k not in pending])
+            found.update(pending)
+        else:
+            found = self._fetch_knowledge(todo)
+        with self.cache_lock:
+            for key in todo:
+                text = self._decode(found[key]) if key in found else _MISSING
+                self._cache_put(key, text)
+                out[key] = None if text is _MISSING else json.loads(text)
+        return out
+    
+    def _fetch_knowledge(self, keys):
+        found = {}
+        for i in range(0, len(keys), 900):
+            chunk = keys[i:i + 900]
+            found.update(self.db.execute(
+                f"SELECT key, value FROM knowledge WHERE key IN ({','.join('?' * len(chunk))})", chunk))
+        return found
+    
+    # === Retention ===
+    # Old task rows leave the live database for monthly gzip JSONL segments next to it
+    # (brain.db -> brain_archive/tasks-2025-01.jsonl.gz). A segment only ever grows by
+    # appended gzip members, so git stores it as cheap deltas; archive_segments records
+    # the committed length of each file. agent_stats/agent_rollups already count the rows.
+    
+    @property
+    def archive_dir(self):
+        return os.path.splitext(self.path)[0] + "_archive"
+    
+    def retain(self, days=RETAIN_DAYS, now=None, vacuum=True):
+        """Archive task rows older than `days` and compact the live database; returns rows moved"""
+        self.flush()
+        cutoff = ((now or datetime.now(timezone.utc)) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+        os.makedirs(self.archive_dir, exist_ok=True)
+        committed = dict(self.db.execute("SELECT name, bytes FROM archive_segments"))
+        orphaned = os.path.join(self.archive_dir, "orphaned")
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        for name in os.listdir(self.archive_dir):
+            path = os.path.join(self.archive_dir, name)
+            if not (name.startswith("tasks-") and name.endswith(".jsonl.gz")):
+                continue
+            # bytes brain.db doesn't know about: a run that died before its commit, or a database
+            # restored out of sync with the archive. Set them aside rather than delete them
+            if name not in committed or os.path.getsize(path) > committed[name]:
+                os.makedirs(orphaned, exist_ok=True)
+                if name not in committed:
+                    os.replace(path, os.path.join(orphaned, f"{name}.{stamp}"))
+                else:
+                    shutil.copyfile(path, os.path.join(orphaned, f"{name}.{stamp}"))
+                    os.truncate(path, committed[name])
+        moved = 0
+        while True:
+            rows = self.db.execute(
+                "SELECT id, agent, task, result, score, ts FROM tasks WHERE ts < ? ORDER BY id LIMIT ?",
+                (cutoff, ARCHIVE_ROWS)
+            ).fetchall()
+            if not rows:
+                break
+            months = {}
+            for row in rows:
+                months.setdefault(f"tasks-{str(row[5])[:7]}.jsonl.gz", []).append(row)
+            segments = []
+            for name, chunk in months.items():
+                path = os.path.join(self.archive_dir, name)
+                with open(path, "ab") as f:
+                    with gzip.GzipFile(fileobj=f, mode="wb") as z:
+                        z.write("".join(json.dumps(row) + "\n" for row in chunk).encode("utf-8"))
+                    f.flush()
+                    os.fsync(f.fileno())
+                segments.append((name, chunk[0][0], chunk[-1][0], min(r[5] for r in chunk),
+                                 max(r[5] for r in chunk), len(chunk), os.path.getsize(path)))
+            with self.db:
+                self.db.executemany("""INSERT INTO archive_segments VALUES (?,?,?,?,?,?,?)
+                    ON CONFLICT(name) DO UPDATE SET first_id = MIN(first_id, excluded.first_id),
+                        last_id = MAX(last_id, excluded.last_id), first_ts = MIN(first_ts, excluded.first_ts),
+                        last_ts = MAX(last_ts, excluded.last_ts), rows = rows + excluded.rows,
+                        bytes = excluded.bytes""", segments)
+                self.db.execute("DELETE FROM tasks WHERE ts < ? AND id <= ?", (cutoff, rows[-1][0]))
+            moved += len(rows)
+        if vacuum and moved:
+            self.db.execute("VACUUM")
+            self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return moved
+    
+    def archived(self, agent=None, since=None, until=None):
+        """Iterate archived task rows, reading only segments that overlap [since, until)"""
+        segments = self.db.execute("""
+            SELECT name, bytes FROM archive_segments
+            WHERE (? IS NULL OR last_ts >= ?) AND (? IS NULL OR first_ts < ?) ORDER BY name
+        """, (since, since, until, until)).fetchall()
+        for name, size in segments:
+            with open(os.path.join(self.archive_dir, name), "rb") as f:
+                data = f.read(size)
+            for line in gzip.GzipFile(fileobj=io.BytesIO(data)):
+                tid, a, task, result, score, ts = json.loads(line)
+                if (agent and a != agent) or (since and ts < since) or (until and ts >= until):
+                    continue
+                yield {"id": tid, "agent": a, "task": task, "result": json.loads(result),
+                       "score": score, "ts": ts}
+    
+    def cache_stats(self):
+        with self.cache_lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return dict(self.counters, entries=len(self.cache),
+                        hit_rate=round(self.counters["hits"] / lookups, 3) if lookups else 0)
     
     def stats(self):
-        rows = self.db.execute("""
-            SELECT agent, COUNT(*), ROUND(AVG(score), 2) 
-            FROM tasks GROUP BY agent
-        """).fetchall()
-        return {r[0]: {"tasks": r[1], "avg_score": r[2]} for r in rows}
\ No newline at end of file
+        """Per-agent totals from agent_stats (plus not yet committed rows in buffered mode)"""
+        if self.buffered:
+            with self.cond:
+                rows = self._stats_rows()
+                pending = self._pending("task")
+        else:
+            rows = self._stats_rows()
+            pending = []
+        totals = {r[0]: list(r[1:]) for r in rows}
+        for agent, _, _, score, ts in pending:
+            t = totals.setdefault(agent, [0, 0, 0.0, None, None, None])
+            t[0] += 1
+            if score is not None:
+                t[1] += 1
+                t[2] += score
+                t[3] = score if t[3] is None else min(t[3], score)
+                t[4] = score if t[4] is None else max(t[4], score)
+            t[5] = ts if t[5] is None else max(t[5], ts)
+        return {agent: {"tasks": n, "avg_score": round(total / scored, 2) if scored else None,
+                        "min_score": lo, "max_score": hi, "last": last}
+                for agent, (n, scored, total, lo, hi, last) in totals.items()}
+    
+    def _stats_rows(self):
+        return self.db.execute(
+            "SELECT agent, tasks, scored, score_sum, score_min, score_max, last_ts FROM agent_stats"
+        ).fetchall()
+    
+    def rollups(self, agent=None, period="day", limit=30):
+        """Latest hour/day buckets: [(agent, start, tasks, avg_score, min_score, max_score)]"""
+        self.flush()
+        where, args = ("WHERE period=? AND agent=?", (period, agent)) if agent else ("WHERE period=?", (period,))
+        rows = self.db.execute(f"""
+            SELECT agent, start, tasks, ROUND(score_sum / NULLIF(scored, 0), 2), score_min, score_max
+            FROM agent_rollups {where} ORDER BY start DESC LIMIT ?
+        """, args + (limit,)).fetchall()
+        return rows
+
+def bench(n=2000):
+    """save_task() throughput with and without write-behind"""
+    import os, tempfile
+    result = {"findings": [{"url": "https://example.com/.git/config", "status": 200}]}
+    with tempfile.TemporaryDirectory() as tmp:
+        for buffered in (False, True):
+            brain = Brain(os.path.join(tmp, f"brain_{buffered}.db"), buffered=buffered)
+            start = time.time()
+            for i in range(n):
+                brain.save_task("security", f"hunt target{i}.com", result, 0.5)
+            brain.close()
+            elapsed = time.time() - start
+            count = brain.db.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+            print(f"buffered={buffered!s:5}  {n / elapsed:,.0f} tasks/sec  ({count} rows)")
+
+def bench_retention(per_run=50, days=365, keep=RETAIN_DAYS):
+    """Synthetic year of hunts (4 runs a day): live DB size with and without retain()"""
+    import random, tempfile
+    rng = random.Random(0)
+    def result():
+        return {"target": f"target{rng.randrange(500)}.com", "findings": [
+            {"url": f"https://target{rng.randrange(500)}.com/{p}", "status": rng.choice([200, 301, 403]),
+             "size": rng.randrange(100, 90000)} for p in rng.sample(["/.git/config", "/.env", "/admin",
+             "/backup.sql", "/server-status", "/phpinfo.php", "/api/v1", "/graphql"], rng.randrange(1, 6))]}
+    start_day = datetime(2025, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        kept, full = Brain(os.path.join(tmp, "kept.db")), Brain(os.path.join(tmp, "full.db"))
+        retain_time = 0.0
+        for day in range(days):
+            rows = []
+            for run in range(4):
+                ts = start_day + timedelta(days=day, hours=6 * run)
+                rows += [("security", f"hunt target{rng.randrange(500)}.com", json.dumps(result()),
+                          rng.random(), (ts + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S"))
+                         for i in range(per_run)]
+            for brain in (kept, full):
+                brain.db.executemany("INSERT INTO tasks (agent, task, result, score, ts) VALUES (?,?,?,?,?)", rows)
+                brain.db.commit()
+            start = time.time()
+            kept.retain(keep, now=start_day + timedelta(days=day + 1))
+            retain_time += time.time() - start
+            if (day + 1) % 60 == 0 or day + 1 == days:
+                archive = sum(os.path.getsize(os.path.join(kept.archive_dir, n)) for n in os.listdir(kept.archive_dir))
+                print(f"day {day + 1:>3}: live {os.path.getsize(kept.path) / 1e6:6.2f} MB, "
+                      f"archive {archive / 1e6:6.2f} MB, no retention {os.path.getsize(full.path) / 1e6:6.2f} MB")
+        start = time.time()
+        archived = sum(1 for _ in kept.archived(since="2025-06-01", until="2025-07-01"))
+        print(f"retain: {retain_time / days * 1000:.0f} ms/day; June from archive: {archived} rows "
+              f"in {time.time() - start:.2f}s; stats tasks={kept.stats()['security']['tasks']}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        bench(int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
+    elif len(sys.argv) > 1 and sys.argv[1] == "retention":
+        bench_retention(int(sys.argv[2]) if len(sys.argv) > 2 else 50)
+    elif len(sys.argv) > 1 and sys.argv[1] == "retain":
+        brain = Brain()
+        moved = brain.retain(int(sys.argv[2]) if len(sys.argv) > 2 else RETAIN_DAYS)
+        print(f"Archived {moved} task rows to {brain.archive_dir}")
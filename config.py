@@ -19,3 +19,4 @@ TICKERS = [
 from pathlib import Path
 DB_PATH = Path(__file__).parent / "brain.db"
 FINDINGS_PATH = Path(__file__).parent / "findings.json"
+HUNT_PATH = Path(__file__).parent / "findings.jsonl"
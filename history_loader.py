@@ -1,39 +1,90 @@
+import asyncio
+import os
+import sys
 import requests
 import sqlite3
 import time
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
 
 from config import TICKERS
+import indicators
 DB = "history.db"
+ISS = os.getenv("ISS_URL", "https://iss.moex.com")
+YEARS = [2020, 2021, 2022, 2023, 2024, 2025]
+PAGE = 100
 
 def init_db():
     conn = sqlite3.connect(DB)
     conn.execute("CREATE TABLE IF NOT EXISTS prices (ticker TEXT, date TEXT, close REAL, volume INTEGER, PRIMARY KEY(ticker, date))")
+    conn.execute("CREATE TABLE IF NOT EXISTS sync_state (ticker TEXT PRIMARY KEY, watermark TEXT, rows INTEGER, synced TEXT)")
+    init_versions(conn)
     conn.commit()
     conn.close()
 
+def init_versions(conn):
+    """price_versions: счётчик изменений prices по тикеру, его ведут триггеры при любой записи.
+    version растёт на каждую строку; edited — версия последней правки задним числом
+    (дата не новее last, UPDATE, DELETE). Читатели (indicators, price_store) по нему решают:
+    версия та же — ничего не делать, edited не новее их версии — только дописать, иначе пересчитать"""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name='price_versions'").fetchone()
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS price_versions (
+            ticker TEXT PRIMARY KEY, version INTEGER NOT NULL, edited INTEGER NOT NULL, last TEXT);
+        CREATE TRIGGER IF NOT EXISTS prices_insert_version AFTER INSERT ON prices BEGIN
+            INSERT INTO price_versions VALUES (new.ticker, 1, 0, new.date)
+            ON CONFLICT(ticker) DO UPDATE SET version = version + 1,
+                edited = CASE WHEN new.date <= last THEN version + 1 ELSE edited END,
+                last = MAX(last, new.date);
+        END;
+        CREATE TRIGGER IF NOT EXISTS prices_update_version AFTER UPDATE ON prices BEGIN
+            INSERT INTO price_versions VALUES (new.ticker, 1, 1, new.date)
+            ON CONFLICT(ticker) DO UPDATE SET version = version + 1, edited = version + 1,
+                last = MAX(last, new.date);
+        END;
+        CREATE TRIGGER IF NOT EXISTS prices_delete_version AFTER DELETE ON prices BEGIN
+            UPDATE price_versions SET version = version + 1, edited = version + 1 WHERE ticker = old.ticker;
+        END;
+    """)
+    if not exists:
+        # база старше триггеров: версия 1 с правкой — читатели один раз пересчитают всё
+        conn.execute("INSERT OR IGNORE INTO price_versions SELECT ticker, 1, 1, MAX(date) FROM prices GROUP BY ticker")
+
+def history_url(ticker, base=None):
+    return (base or ISS) + "/iss/history/engines/stock/markets/shares/boards/TQBR/securities/" + ticker + ".json"
+
+def parse_rows(ticker, rows):
+    return [(ticker, row[1], row[11], row[12] or 0) for row in rows if row[11]]
+
 def fetch_prices(ticker, year):
-    url = "https://iss.moex.com/iss/history/engines/stock/markets/shares/boards/TQBR/securities/" + ticker + ".json"
-    start = str(year) + "-01-01"
-    end = str(year) + "-12-31"
-    all_data = []
+    return fetch_range(ticker, str(year) + "-01-01", str(year) + "-12-31")
+
+def fetch_range(ticker, start, end):
+    return list(iter_range(ticker, start, end))
+
+def iter_range(ticker, start, end):
+    """Строки по страницам, без накопления всего диапазона в памяти"""
+    url = history_url(ticker)
     cursor = 0
     while True:
-        params = {"from": start, "till": end, "start": cursor, "limit": 100}
+        params = {"from": start, "till": end, "start": cursor, "limit": PAGE}
         r = requests.get(url, params=params, timeout=15)
         if r.status_code != 200:
-            break
+            # обрыв посреди диапазона: наверх, чтобы watermark не сдвинулся на недокачанное
+            raise requests.HTTPError(f"{r.status_code} {url} start={cursor}", response=r)
         data = r.json()
         rows = data.get("history", {}).get("data", [])
         if not rows:
             break
-        for row in rows:
-            if row[11]:
-                all_data.append((ticker, row[1], row[11], row[12] or 0))
-        cursor += 100
-        if len(rows) < 100:
+        yield from parse_rows(ticker, rows)
+        cursor += PAGE
+        if len(rows) < PAGE:
             break
-    return all_data
 
 def save_prices(data):
     conn = sqlite3.connect(DB)
@@ -41,22 +92,325 @@ def save_prices(data):
     conn.commit()
     conn.close()
 
-def main():
+class PriceWriter:
+    """Долгоживущий писатель prices: WAL, крупные транзакции, сброс по размеру/времени"""
+    def __init__(self, db=None, batch=50000, interval=2.0):
+        self.conn = sqlite3.connect(db or DB)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-65536")
+        self.batch = batch
+        self.interval = interval
+        self.buffer = []
+        self.flushed = time.monotonic()
+        self.rows = 0
+
+    def write(self, rows):
+        """Принимает любой итератор строк (ticker, date, close, volume)"""
+        n = 0
+        for row in rows:
+            self.buffer.append(row)
+            n += 1
+            # и по времени внутри цикла: на медленном итераторе сброс не ждёт его конца
+            if len(self.buffer) >= self.batch or time.monotonic() - self.flushed >= self.interval:
+                self.flush()
+        if self.buffer and time.monotonic() - self.flushed >= self.interval:
+            self.flush()
+        return n
+
+    def flush(self):
+        if self.buffer:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO prices VALUES (?,?,?,?)", self.buffer)
+            self.rows += len(self.buffer)
+            self.buffer = []
+        self.flushed = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# === INCREMENTAL SYNC ===
+
+def get_watermark(conn, ticker):
+    """Последняя сохранённая дата тикера; None если нужна полная перезагрузка"""
+    state = conn.execute("SELECT watermark, rows FROM sync_state WHERE ticker=?", (ticker,)).fetchone()
+    last, rows = conn.execute("SELECT MAX(date), COUNT(*) FROM prices WHERE ticker=?", (ticker,)).fetchone()
+    if not last:
+        return None
+    if state is None:
+        # первый инкрементальный прогон по базе, загруженной main()
+        return last
+    if state != (last, rows):
+        # строки пропали или легли мимо состояния — дыра
+        return None
+    return last
+
+def sync_ticker(conn, ticker, today=None):
+    """Докачивает тикер с watermark+1; при дыре — полная перезагрузка"""
+    today = today or datetime.now().strftime("%Y-%m-%d")
+    watermark = get_watermark(conn, ticker)
+    if watermark:
+        start = (datetime.strptime(watermark, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        mode = "incremental"
+    else:
+        start = str(YEARS[0]) + "-01-01"
+        mode = "full"
+    data = fetch_range(ticker, start, today) if start <= today else []
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO prices VALUES (?,?,?,?)", data)
+        mark_synced(conn, [ticker])
+    return mode, len(data)
+
+def mark_failed(conn, tickers):
+    """Недокачанные тикеры: пустой watermark не совпадёт с prices, следующий sync перезагрузит их целиком"""
+    now = datetime.now().isoformat()
+    for ticker in tickers:
+        conn.execute("INSERT OR REPLACE INTO sync_state VALUES (?,?,?,?)", (ticker, None, 0, now))
+
+def mark_synced(conn, tickers):
+    now = datetime.now().isoformat()
+    for ticker in tickers:
+        last, rows = conn.execute("SELECT MAX(date), COUNT(*) FROM prices WHERE ticker=?", (ticker,)).fetchone()
+        if last:
+            conn.execute("INSERT OR REPLACE INTO sync_state VALUES (?,?,?,?)", (ticker, last, rows, now))
+
+def sync():
     init_db()
-    years = [2020, 2021, 2022, 2023, 2024, 2025]
+    conn = sqlite3.connect(DB)
+    new = 0
     for ticker in TICKERS:
-        print(ticker, "...", end=" ")
-        total = 0
-        for year in years:
-            data = fetch_prices(ticker, year)
-            save_prices(data)
-            total += len(data)
-            time.sleep(0.3)
-        print(total, "days")
+        try:
+            mode, n = sync_ticker(conn, ticker)
+        except requests.RequestException as e:
+            print(ticker, "error", e)
+            continue
+        print(ticker, mode, "+" + str(n))
+        new += n
+    conn.close()
+    indicators.update(DB)
+    print("Synced:", new, "new records")
+
+def main():
+    init_db()
+    failed = []
+    with PriceWriter() as writer:
+        for ticker in TICKERS:
+            print(ticker, "...", end=" ")
+            total = 0
+            try:
+                for year in YEARS:
+                    total += writer.write(iter_range(ticker, str(year) + "-01-01", str(year) + "-12-31"))
+                    time.sleep(0.3)
+            except requests.RequestException as e:
+                failed.append(ticker)
+                print("error", e)
+                continue
+            print(total, "days")
     conn = sqlite3.connect(DB)
+    with conn:
+        mark_synced(conn, [t for t in TICKERS if t not in failed])
+        mark_failed(conn, failed)
+    indicators.update(DB)
     cnt = conn.execute("SELECT COUNT(*) FROM prices").fetchone()[0]
     conn.close()
     print("Total:", cnt, "records in history.db")
 
+# === ASYNC BACKFILL ===
+
+class TokenBucket:
+    """Ограничитель частоты: rate запросов/сек, пачка до burst"""
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class AsyncLoader:
+    """Параллельная загрузка истории: тикер x год x страница"""
+    def __init__(self, db=None, base=None, concurrency=8, rate=10.0, retries=3):
+        self.db = db or DB
+        self.base = base or ISS
+        self.concurrency = concurrency
+        self.rate = rate
+        self.retries = retries
+        self.buckets = {}
+        self.requests = 0
+        self.rows = 0
+        self.failed = set()
+
+    def _bucket(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate)
+        return self.buckets[host]
+
+    async def _get(self, session, sem, url, params):
+        for attempt in range(self.retries):
+            await self._bucket(url).acquire()
+            async with sem:
+                try:
+                    async with session.get(url, params=params) as r:
+                        self.requests += 1
+                        if r.status == 200:
+                            return await r.json(content_type=None)
+                        if r.status < 500 and r.status != 429:
+                            return None
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    pass
+            await asyncio.sleep(0.5 * 2 ** attempt)
+        return None
+
+    async def _page(self, session, sem, queue, ticker, year, start):
+        url = history_url(ticker, self.base)
+        params = {"from": str(year) + "-01-01", "till": str(year) + "-12-31", "start": start, "limit": PAGE}
+        data = await self._get(session, sem, url, params)
+        if not data:
+            self.failed.add(ticker)
+            return None
+        rows = data.get("history", {}).get("data", [])
+        if rows:
+            await queue.put(parse_rows(ticker, rows))
+        return data
+
+    async def _year(self, session, sem, queue, ticker, year):
+        data = await self._page(session, sem, queue, ticker, year, 0)
+        if not data:
+            return
+        rows = data.get("history", {}).get("data", [])
+        cursor = data.get("history.cursor", {}).get("data", [])
+        if cursor and cursor[0] and len(cursor[0]) > 1:
+            # ISS отдаёт TOTAL — остальные страницы качаем параллельно
+            total = cursor[0][1]
+            await asyncio.gather(*[self._page(session, sem, queue, ticker, year, start)
+                                   for start in range(PAGE, total, PAGE)])
+            return
+        start = PAGE
+        while len(rows) >= PAGE:
+            data = await self._page(session, sem, queue, ticker, year, start)
+            rows = data.get("history", {}).get("data", []) if data else []
+            start += PAGE
+
+    async def _writer(self, queue):
+        with PriceWriter(self.db) as writer:
+            while True:
+                batch = await queue.get()
+                if batch is None:
+                    break
+                self.rows += writer.write(batch)
+
+    async def run(self, tickers=None, years=None):
+        tickers = tickers or TICKERS
+        years = years or YEARS
+        sem = asyncio.Semaphore(self.concurrency)
+        queue = asyncio.Queue(maxsize=self.concurrency * 4)
+        timeout = aiohttp.ClientTimeout(total=15)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        start = time.time()
+        writer = asyncio.create_task(self._writer(queue))
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            producers = asyncio.gather(*[self._year(session, sem, queue, t, y) for t in tickers for y in years])
+            await asyncio.wait([producers, writer], return_when=asyncio.FIRST_COMPLETED)
+            if writer.done():
+                # писатель упал: иначе производители навсегда встанут на полной очереди
+                producers.cancel()
+                await asyncio.gather(producers, return_exceptions=True)
+                await writer
+            try:
+                await producers
+            except BaseException:
+                writer.cancel()
+                raise
+        await queue.put(None)
+        await writer
+        conn = sqlite3.connect(self.db)
+        with conn:
+            mark_synced(conn, [t for t in tickers if t not in self.failed])
+            mark_failed(conn, self.failed)
+        conn.close()
+        elapsed = time.time() - start
+        return {"rows": self.rows, "requests": self.requests, "failed": sorted(self.failed), "seconds": round(elapsed, 2),
+                "rows_per_sec": round(self.rows / elapsed, 1) if elapsed else 0}
+
+def main_async(concurrency=8, rate=10.0):
+    init_db()
+    stats = asyncio.run(AsyncLoader(concurrency=concurrency, rate=rate).run())
+    indicators.update(DB)
+    print("Loaded:", stats["rows"], "rows,", stats["requests"], "requests in", stats["seconds"], "s")
+    print("Speed:", stats["rows_per_sec"], "rows/sec")
+    if stats["failed"]:
+        print("Failed (full reload on next sync):", " ".join(stats["failed"]))
+    return stats
+
+# === BENCHMARK ===
+
+def synthetic_rows(tickers=52, years=10):
+    for t in range(tickers):
+        ticker = "T" + str(t).zfill(3)
+        for y in range(years):
+            day = datetime(2015 + y, 1, 1)
+            for d in range(252):
+                yield (ticker, (day + timedelta(days=d)).strftime("%Y-%m-%d"), 100.0 + d % 17, 1000 + d)
+
+def bench(tickers=52, years=10):
+    """save_prices() на каждый тикер-год против одного PriceWriter"""
+    import tempfile
+    global DB
+    saved = DB
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ["save_prices", "PriceWriter"]:
+                DB = os.path.join(tmp, name + ".db")
+                init_db()
+                start = time.time()
+                if name == "save_prices":
+                    chunk, key = [], None
+                    for row in synthetic_rows(tickers, years):
+                        if chunk and (row[0], row[1][:4]) != key:
+                            save_prices(chunk)
+                            chunk = []
+                        key = (row[0], row[1][:4])
+                        chunk.append(row)
+                    save_prices(chunk)
+                else:
+                    with PriceWriter() as writer:
+                        writer.write(synthetic_rows(tickers, years))
+                elapsed = time.time() - start
+                conn = sqlite3.connect(DB)
+                rows = conn.execute("SELECT COUNT(*) FROM prices").fetchone()[0]
+                conn.close()
+                results[name] = round(rows / elapsed)
+                print(name, rows, "rows in", round(elapsed, 2), "s:", results[name], "rows/sec")
+    finally:
+        DB = saved
+    return results
+
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "sync":
+        sync()
+    elif len(sys.argv) > 1 and sys.argv[1] == "bench":
+        bench()
+    elif len(sys.argv) > 1 and sys.argv[1] == "async":
+        main_async(int(sys.argv[2]) if len(sys.argv) > 2 else 8)
+    else:
+        main()
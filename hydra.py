@@ -1,13 +1,43 @@
 #!/usr/bin/env python3
 """HYDRA v2 - Self-Evolving AI System"""
+import asyncio
+import os
 import sys
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from brain import Brain
 from agents import SecurityAgent
+from agents import security
+
+HUNT_WORKERS = int(os.getenv("HUNT_WORKERS", "16"))   # targets scanned at once
+HUNT_BUDGET = int(os.getenv("HUNT_BUDGET", "64"))     # requests in flight across all targets
+
+def read_targets(source):
+    """Targets from a file or stdin ("-"), one per line; blank lines, # comments and repeats skipped"""
+    lines = sys.stdin if source == "-" else open(source)
+    with lines:
+        return list(dict.fromkeys(t.strip() for t in lines if t.strip() and not t.startswith("#")))
+
+def hunted(path):
+    """Targets already scanned successfully in a hunt-many output file; failed ones are retried"""
+    done = set()
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # line cut short by an interrupted run
+                if entry.get("ok"):
+                    done.add(entry["target"])
+    except FileNotFoundError:
+        pass
+    return done
 
 class Hydra:
-    def __init__(self):
-        self.brain = Brain()
+    def __init__(self, buffered=False):
+        self.brain = Brain(buffered=buffered)
         self.agents = {
             "security": SecurityAgent(self.brain),
         }
@@ -24,28 +54,101 @@ class Hydra:
         print(f"[HYDRA] → {agent_name.upper()}")
         return agent.run(task)
     
-    def status(self):
+    def hunt_many(self, targets, out, workers=HUNT_WORKERS, budget=HUNT_BUDGET):
+        """Scan targets through a worker pool, appending one JSONL line per finished target to out.
+        Targets already scanned successfully in out are skipped, so an interrupted run picks up
+        where it stopped and retries the ones that failed."""
+        agent = self.agents["security"]
+        done = hunted(out)
+        todo = [t for t in targets if t not in done]
+        start = time.time()
+        failed = [0]
+        with open(out, "a") as f:
+            if f.tell():
+                with open(out, "rb") as tail:
+                    tail.seek(-1, os.SEEK_END)
+                    if tail.read() != b"\n":
+                        f.write("\n")
+    
+            def emit(target, result, error=None):
+                entry = {"target": target, "ok": False, "error": error}
+                if error is None:
+                    score = agent.evaluate(result)
+                    self.brain.save_task(agent.name, f"hunt {target}", result, score)
+                    # unreachable target: keep the line, but retry it on resume
+                    ok = not any(finding.get("type") == "ERROR" for finding in result)
+                    entry = {"target": target, "ok": ok, "result": result, "score": score}
+                failed[0] += not entry["ok"]
+                line = json.dumps(entry)
+                f.write(line + "\n")
+                f.flush()
+                print(line, flush=True)
+    
+            if security.aiohttp is None:
+                # sequential scans: one request in flight per worker
+                with ThreadPoolExecutor(max(1, min(workers, budget))) as pool:
+                    futures = {pool.submit(agent._scan_sync, t): t for t in todo}
+                    for future in as_completed(futures):
+                        try:
+                            result, error = future.result(), None
+                        except Exception as e:
+                            result, error = None, str(e) or type(e).__name__
+                        emit(futures[future], result, error)
+            else:
+                asyncio.run(self._hunt_async(agent, todo, emit, workers, budget))
+        self.brain.flush()
+        elapsed = time.time() - start
+        return {"targets": len(todo), "failed": failed[0], "skipped": len(targets) - len(todo),
+                "seconds": round(elapsed, 1), "per_min": round(len(todo) / elapsed * 60, 1) if elapsed else 0}
+    
+    @staticmethod
+    async def _hunt_async(agent, todo, emit, workers, budget):
+        budget = asyncio.Semaphore(budget)
+        queue = iter(todo)
+    
+        async def worker():
+            for target in queue:
+                try:
+                    result, error = await agent.scan_async(target, budget), None
+                except Exception as e:
+                    result, error = None, str(e) or type(e).__name__
+                emit(target, result, error)
+    
+        await asyncio.gather(*[worker() for _ in range(min(workers, len(todo)))])
+    
+    def status(self, period=None):
+        if period:
+            return [dict(zip(("agent", "start", "tasks", "avg_score", "min_score", "max_score"), r))
+                    for r in self.brain.rollups(period=period)]
         return self.brain.stats()
 
 def main():
-    h = Hydra()
+    h = Hydra(buffered=len(sys.argv) > 1 and sys.argv[1] == "hunt-many")
     
     if len(sys.argv) < 2:
         print("HYDRA v2")
         print("  python hydra.py hunt <target>")
-        print("  python hydra.py status")
+        print("  python hydra.py hunt-many [targets.txt|-] [out.jsonl]")
+        print("  python hydra.py status [hour|day]")
         return
     
     cmd = sys.argv[1]
     
     if cmd == "status":
-        print(json.dumps(h.status(), indent=2))
+        period = sys.argv[2] if len(sys.argv) > 2 and sys.argv[2] in ("hour", "day") else None
+        print(json.dumps(h.status(period), indent=2))
     elif cmd == "hunt" and len(sys.argv) > 2:
         result = h.run(f"hunt {sys.argv[2]}")
         print(json.dumps(result, indent=2))
         # Save findings
         from config import FINDINGS_PATH
         FINDINGS_PATH.write_text(json.dumps(result, indent=2))
+    elif cmd == "hunt-many":
+        from config import HUNT_PATH
+        targets = read_targets(sys.argv[2] if len(sys.argv) > 2 else "-")
+        summary = h.hunt_many(targets, sys.argv[3] if len(sys.argv) > 3 else HUNT_PATH)
+        print(f"[HYDRA] {summary['targets']} targets in {summary['seconds']}s ({summary['per_min']}/min), "
+              f"{summary['failed']} failed, {summary['skipped']} already done", file=sys.stderr)
     else:
         result = h.run(" ".join(sys.argv[1:]))
         print(json.dumps(result, indent=2))
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+ROLLING INDICATORS - инкрементальные SMA/EMA/STD по таблице prices
+Состояние каждого индикатора лежит в history.db и обновляется за O(1) на новую строку.
+"""
+
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+from collections import deque
+
+HISTORY_DB = "history.db"
+
+# имя -> (тип, колонка, окно)
+SPECS = {
+    "sma10": ("sma", "close", 10),
+    "sma20": ("sma", "close", 20),
+    "ema10": ("ema", "close", 10),
+    "ema20": ("ema", "close", 20),
+    "std20": ("std", "close", 20),
+    "vol20": ("sma", "volume", 20),
+}
+
+class SMA:
+    def __init__(self, window, state=None):
+        state = state or {}
+        self.window = window
+        self.values = deque(state.get("values", []), maxlen=window)
+        self.count = state.get("count", len(self.values))
+
+    def update(self, x):
+        self.values.append(x)
+        self.count += 1
+
+    @property
+    def ready(self):
+        return len(self.values) == self.window
+
+    @property
+    def value(self):
+        # сумма от свежих к старым — как в get_ma(), чтобы округление совпадало
+        return sum(reversed(self.values)) / len(self.values) if self.values else None
+
+    def state(self):
+        return {"values": list(self.values), "count": self.count}
+
+class RollingStd(SMA):
+    def __init__(self, window, state=None):
+        super().__init__(window, state)
+        state = state or {}
+        self.total = state.get("total", sum(self.values))
+        self.total_sq = state.get("total_sq", sum(x * x for x in self.values))
+
+    def update(self, x):
+        if len(self.values) == self.window:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        super().update(x)
+        self.total += x
+        self.total_sq += x * x
+        if self.count % self.window == 0:
+            # раз в окно пересчитываем суммы, чтобы не копилась ошибка
+            self.total = sum(self.values)
+            self.total_sq = sum(x * x for x in self.values)
+
+    @property
+    def value(self):
+        n = len(self.values)
+        if not n:
+            return None
+        mean = self.total / n
+        return math.sqrt(max(0.0, self.total_sq / n - mean * mean))
+
+    def state(self):
+        return dict(super().state(), total=self.total, total_sq=self.total_sq)
+
+class EMA:
+    def __init__(self, window, state=None):
+        state = state or {}
+        self.window = window
+        self.alpha = 2 / (window + 1)
+        self.value = state.get("value")
+        self.count = state.get("count", 0)
+        self.last = state.get("last")
+
+    def update(self, x):
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        self.last = x
+        self.count += 1
+
+    @property
+    def ready(self):
+        return self.count >= self.window
+
+    def state(self):
+        return {"value": self.value, "count": self.count, "last": self.last}
+
+KINDS = {"sma": SMA, "ema": EMA, "std": RollingStd}
+FIELDS = {"close": 1, "volume": 2}
+
+def init_db(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS indicators (
+        ticker TEXT, name TEXT, date TEXT, value REAL, last REAL, ready INTEGER, state TEXT,
+        PRIMARY KEY(ticker, name))""")
+
+def _last(ind):
+    return ind.values[-1] if hasattr(ind, "values") else ind.last
+
+def _versions(conn):
+    """{ticker: (version, edited)} из price_versions, которую ведут триггеры history_loader"""
+    try:
+        return {r[0]: (r[1], r[2]) for r in conn.execute("SELECT ticker, version, edited FROM price_versions")}
+    except sqlite3.OperationalError:
+        return {}
+
+def update(db=HISTORY_DB, tickers=None):
+    """Прогоняет через индикаторы только строки prices новее сохранённого состояния.
+    Состояние помнит версию prices тикера, на которой посчитано: та же версия — тикер пропускается,
+    правка задним числом после неё (edited) — индикатор считается заново с начала истории"""
+    conn = sqlite3.connect(db)
+    init_db(conn)
+    versions = _versions(conn)
+    tickers = tickers or [r[0] for r in conn.execute("SELECT DISTINCT ticker FROM prices")]
+    saved = {}
+    for ticker, name, date, state in conn.execute("SELECT ticker, name, date, state FROM indicators"):
+        saved[ticker, name] = (date, json.loads(state))
+    out, added = [], 0
+    for ticker in tickers:
+        version, edited = versions.get(ticker, (None, None))
+        states = [saved.get((ticker, name), ("", None))[1] for name in SPECS]
+        if version is not None and all(state and state.get("version") == version for state in states):
+            continue
+        inds = {}
+        for name, (kind, _, window) in SPECS.items():
+            date, state = saved.get((ticker, name), ("", None))
+            if state is not None and (version is None or (state.get("version") or 0) < edited):
+                date, state = "", None
+            inds[name] = [date, KINDS[kind](window, state)]
+        since = min(item[0] for item in inds.values())
+        # версию читаем до строк: строк может оказаться больше, чем в ней, но не меньше
+        rows = conn.execute("SELECT date, close, volume FROM prices WHERE ticker=? AND date>? ORDER BY date",
+                            (ticker, since)).fetchall()
+        for row in rows:
+            for name, item in inds.items():
+                if row[0] > item[0]:
+                    item[1].update(row[FIELDS[SPECS[name][1]]])
+                    item[0] = row[0]
+        for name, (date, ind) in inds.items():
+            if date:
+                out.append((ticker, name, date, ind.value, _last(ind), int(ind.ready),
+                            json.dumps(dict(ind.state(), version=version))))
+        added += len(rows)
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO indicators VALUES (?,?,?,?,?,?,?)", out)
+    conn.close()
+    return len(tickers), added
+
+# индикатор актуален, пока версия prices тикера та же, на которой он посчитан
+FRESH = """SELECT {} FROM indicators i JOIN price_versions v
+    ON v.ticker = i.ticker AND v.version = json_extract(i.state, '$.version')
+    WHERE i.name = ?"""
+
+def _query(db, sql, args):
+    if not os.path.exists(db):
+        return []
+    conn = sqlite3.connect(db)
+    try:
+        return conn.execute(sql, args).fetchall()
+    except sqlite3.OperationalError:
+        return []
+    finally:
+        conn.close()
+
+def lookup(name, db=HISTORY_DB):
+    """{ticker: (value, ready, last)} по индикатору; тикеры, где prices менялись после расчёта, не попадают"""
+    rows = _query(db, FRESH.format("i.ticker, i.value, i.ready, i.last"), (name,))
+    return {r[0]: (r[1], bool(r[2]), r[3]) for r in rows}
+
+def get(ticker, name, db=HISTORY_DB):
+    """(value, ready, last) или None, если индикатор не посчитан или устарел"""
+    rows = _query(db, FRESH.format("i.value, i.ready, i.last") + " AND i.ticker = ?", (name, ticker))
+    return (rows[0][0], bool(rows[0][1]), rows[0][2]) if rows else None
+
+if __name__ == "__main__":
+    start = time.time()
+    db = sys.argv[1] if len(sys.argv) > 1 else HISTORY_DB
+    n, rows = update(db)
+    print("Indicators:", n, "tickers, +" + str(rows), "rows in", round(time.time() - start, 2), "s")
@@ -0,0 +1,142 @@
+"""LLM client - chat completions with a persistent cache and in-flight coalescing"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import requests
+
+from config import API_KEY, API_URL
+
+CACHE_DB = os.getenv("LLM_CACHE_DB", ".llm_cache.db")
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+CACHE_MAX = int(os.getenv("LLM_CACHE_MAX", "5000"))
+
+def cache_key(payload):
+    """Hash of model, messages and sampling params"""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+class LLMClient:
+    def __init__(self, api_url=None, api_key=None, db_path=None, ttl=None, max_entries=None):
+        self.api_url = api_url or API_URL
+        self.api_key = api_key if api_key is not None else API_KEY
+        self.ttl = CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or CACHE_MAX
+        self.db = sqlite3.connect(db_path or CACHE_DB, check_same_thread=False)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS completions (
+            key TEXT PRIMARY KEY, response TEXT, created REAL, used REAL, tokens INTEGER, latency REAL)""")
+        self.db.commit()
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.pending = {}
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "tokens_saved": 0, "latency_saved": 0.0}
+
+    def _headers(self):
+        return {"Authorization": "Bearer " + self.api_key}
+
+    def _lookup(self, key):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT response, tokens, latency FROM completions WHERE key=? AND created>?",
+                (key, time.time() - self.ttl)).fetchone()
+            if not row:
+                return None
+            self.db.execute("UPDATE completions SET used=? WHERE key=?", (time.time(), key))
+            self.db.commit()
+            self.counters["hits"] += 1
+            self.counters["tokens_saved"] += row[1] or 0
+            self.counters["latency_saved"] += row[2] or 0
+            return json.loads(row[0])
+
+    def _store(self, key, data, latency):
+        tokens = (data.get("usage") or {}).get("total_tokens", 0)
+        now = time.time()
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO completions VALUES (?,?,?,?,?,?)",
+                            (key, json.dumps(data, ensure_ascii=False), now, now, tokens, latency))
+            self.db.execute("DELETE FROM completions WHERE created<=?", (now - self.ttl,))
+            self.db.execute("""DELETE FROM completions WHERE key IN (
+                SELECT key FROM completions ORDER BY used DESC LIMIT -1 OFFSET ?)""", (self.max_entries,))
+            self.db.commit()
+
+    def complete(self, payload, timeout=None):
+        """POST payload (model, messages, params); returns the decoded response"""
+        key = cache_key(payload)
+        data = self._lookup(key)
+        if data is not None:
+            return data
+        with self.lock:
+            waiter = self.inflight.get(key)
+            if waiter is None:
+                self.inflight[key] = slot = {"done": threading.Event()}
+                self.counters["misses"] += 1
+            else:
+                self.counters["coalesced"] += 1
+        if waiter is not None:
+            waiter["done"].wait()
+            if "error" in waiter:
+                raise waiter["error"]
+            return waiter["data"]
+        try:
+            start = time.time()
+            r = requests.post(self.api_url, headers=self._headers(), json=payload, timeout=timeout)
+            r.raise_for_status()
+            slot["data"] = data = r.json()
+            if data.get("choices"):
+                self._store(key, data, time.time() - start)
+            return data
+        except Exception as e:
+            slot["error"] = e
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+            slot["done"].set()
+
+    async def acomplete(self, session, payload, timeout=None):
+        """complete() for an aiohttp session; identical concurrent prompts share one request"""
+        key = cache_key(payload)
+        data = self._lookup(key)
+        if data is not None:
+            return data
+        with self.lock:
+            future = self.pending.get(key)
+            if future is None:
+                future = self.pending[key] = asyncio.get_running_loop().create_future()
+                self.counters["misses"] += 1
+                owner = True
+            else:
+                self.counters["coalesced"] += 1
+                owner = False
+        if not owner:
+            return await asyncio.shield(future)
+        try:
+            start = time.time()
+            async with session.post(self.api_url, headers=self._headers(), json=payload, timeout=timeout) as r:
+                r.raise_for_status()
+                data = await r.json(content_type=None)
+            if data.get("choices"):
+                self._store(key, data, time.time() - start)
+            future.set_result(data)
+            return data
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+            entries = self.db.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        total = counters["hits"] + counters["misses"] + counters["coalesced"]
+        saved = counters["hits"] + counters["coalesced"]
+        return dict(counters, entries=entries, latency_saved=round(counters["latency_saved"], 2),
+                    hit_rate=round(saved / total, 3) if total else 0)
@@ -1,10 +1,107 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
 import requests
+from requests.adapters import HTTPAdapter
 
-def get_stock_data(ticker):
+# Общая сессия: keep-alive и пул соединений на весь процесс
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# TTL-кэш ответов: в памяти + необязательно на диске (MOEX_CACHE_DIR)
+CACHE_DIR = os.getenv("MOEX_CACHE_DIR", "")
+MARKET_TTL = 10
+HISTORY_TTL = 3600
+DIVIDENDS_TTL = 6 * 3600
+SNAPSHOT_TTL = int(os.getenv("MOEX_SNAPSHOT_TTL", MARKET_TTL))   # сколько секунд доска переиспользуется
+SNAPSHOT_STALE = 300   # сколько секунд отдавать старую доску, если MOEX не отвечает
+_cache = {}
+_stats = {"hits": 0, "misses": 0, "disk_hits": 0}
+
+def until_midnight():
+    now = datetime.now()
+    return ((now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0) - now).total_seconds()
+
+def _disk_path(key):
+    return os.path.join(CACHE_DIR, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+def get_json(url, params=None, ttl=0, timeout=10):
+    """GET с кэшем по (url, params); ttl в секундах — допустимый возраст ответа, 0 — без кэша.
+    Возраст проверяется по ttl вызывающего, а не по ttl того, кто положил ответ в кэш"""
+    key = url + "?" + json.dumps(sorted((params or {}).items()))
+    now = time.time()
+    hit = _cache.get(key) if ttl else None
+    if hit and 0 <= now - hit[0] < ttl:
+        _stats["hits"] += 1
+        return hit[1]
+    if ttl and CACHE_DIR:
+        try:
+            with open(_disk_path(key)) as f:
+                fetched, data = json.load(f)
+            if 0 <= now - fetched < ttl:
+                _cache[key] = (fetched, data)
+                _stats["hits"] += 1
+                _stats["disk_hits"] += 1
+                return data
+        except (OSError, ValueError):
+            pass
+    _stats["misses"] += 1
+    r = session.get(url, params=params, timeout=timeout)
+    r.raise_for_status()
+    data = r.json()
+    if ttl or key in _cache:
+        _cache[key] = (now, data)
+    if ttl and CACHE_DIR:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(_disk_path(key), "w") as f:
+            json.dump([now, data], f)
+    return data
+
+def cache_stats():
+    total = _stats["hits"] + _stats["misses"]
+    return dict(_stats, size=len(_cache), hit_rate=round(_stats["hits"] / total, 3) if total else 0)
+
+def clear_cache():
+    _cache.clear()
+
+BOARD_URL = "https://iss.moex.com/iss/engines/stock/markets/shares/boards/TQBR/securities.json"
+BOARD_FIELDS = {
+    "price": "LAST", "change": "LASTTOPREVPRICE", "open": "OPEN", "high": "HIGH",
+    "low": "LOW", "volume": "VOLTODAY", "value": "VALTODAY", "bid": "BID",
+    "offer": "OFFER", "time": "UPDATETIME",
+}
+_snapshot = {"raw": None, "data": {}, "at": 0}
+
+def get_board_snapshot(max_age=None):
+    """Котировки всей доски TQBR одним запросом: {ticker: {price, change, volume, ...}}
+    Если MOEX не отвечает, отдаётся последняя доска не старше SNAPSHOT_STALE, дальше — пустая"""
+    try:
+        raw = get_json(BOARD_URL, {"iss.only": "marketdata", "iss.meta": "off"},
+                       ttl=SNAPSHOT_TTL if max_age is None else max_age)
+        if raw is _snapshot["raw"]:
+            return _snapshot["data"]
+        md = raw["marketdata"]
+        cols = {c: i for i, c in enumerate(md["columns"])}
+        sec = cols["SECID"]
+        fields = [(k, cols[n]) for k, n in BOARD_FIELDS.items() if n in cols]
+        data = {row[sec]: {k: row[i] for k, i in fields} for row in md["data"]}
+        _snapshot.update(raw=raw, data=data, at=time.time())
+        return data
+    except:
+        if time.time() - _snapshot["at"] < SNAPSHOT_STALE:
+            return _snapshot["data"]
+        return {}
+
+def get_stock_data(ticker, snapshot=None):
+    snapshot = get_board_snapshot() if snapshot is None else snapshot
+    if ticker in snapshot:
+        row = snapshot[ticker]
+        return {"price": row.get("price"), "change": row.get("change")}
     try:
         url = f"https://iss.moex.com/iss/engines/stock/markets/shares/boards/TQBR/securities/{ticker}.json"
-        r = requests.get(url, timeout=10)
-        data = r.json()
+        data = get_json(url, ttl=MARKET_TTL)
         md = data["marketdata"]["data"]
         if md and len(md) > 0:
             cols = data["marketdata"]["columns"]
@@ -18,38 +115,33 @@ def get_stock_data(ticker):
 def get_commodity(code):
     try:
         if code in ["USD", "EUR", "CNY"]:
-            r = requests.get("https://www.cbr-xml-daily.ru/daily_json.js", timeout=10)
-            d = r.json()["Valute"][code]
+            d = get_json("https://www.cbr-xml-daily.ru/daily_json.js", ttl=until_midnight())["Valute"][code]
             return {"price": d["Value"], "change": round((d["Value"] - d["Previous"]) / d["Previous"] * 100, 2)}
         if code == "GOLD":
-            r = requests.get("https://iss.moex.com/iss/engines/currency/markets/selt/boards/CETS/securities/GLDRUB_TOM.json", timeout=10)
-            md = r.json()["marketdata"]["data"]
+            md = get_json("https://iss.moex.com/iss/engines/currency/markets/selt/boards/CETS/securities/GLDRUB_TOM.json", ttl=MARKET_TTL)["marketdata"]
+            cols, md = md["columns"], md["data"]
             if md and md[0]:
-                cols = r.json()["marketdata"]["columns"]
                 return {"price": md[0][cols.index("LAST")] if "LAST" in cols else None, "change": None}
         if code == "RGBI":
-            r = requests.get("https://iss.moex.com/iss/engines/stock/markets/index/boards/RTSI/securities/RGBI.json", timeout=10)
-            md = r.json()["marketdata"]["data"]
+            md = get_json("https://iss.moex.com/iss/engines/stock/markets/index/boards/RTSI/securities/RGBI.json", ttl=MARKET_TTL)["marketdata"]
+            cols, md = md["columns"], md["data"]
             if md and md[0]:
-                cols = r.json()["marketdata"]["columns"]
                 last = md[0][cols.index("CURRENTVALUE")] if "CURRENTVALUE" in cols else 0
                 return {"price": last, "change": 0}
     except:
         pass
     return {"price": None, "change": None}
 
-def get_price(ticker):
-    data = get_stock_data(ticker)
+def get_price(ticker, snapshot=None):
+    data = get_stock_data(ticker, snapshot)
     return data.get("price")
 
 def get_trend(ticker, days=5):
     try:
-        from datetime import datetime, timedelta
         end = datetime.now().strftime("%Y-%m-%d")
         start = (datetime.now() - timedelta(days=days+5)).strftime("%Y-%m-%d")
         url = f"https://iss.moex.com/iss/history/engines/stock/markets/shares/securities/{ticker}.json?from={start}&till={end}"
-        r = requests.get(url, timeout=10)
-        data = r.json()["history"]["data"]
+        data = get_json(url, ttl=HISTORY_TTL)["history"]["data"]
         if len(data) < 2: return None
         prices = [row[11] for row in data if row[11]]
         if len(prices) < 2: return None
@@ -59,8 +151,7 @@ def get_trend(ticker, days=5):
 
 def get_dividends(ticker):
     try:
-        r = requests.get(f"https://iss.moex.com/iss/securities/{ticker}/dividends.json", timeout=10)
-        data = r.json()["dividends"]["data"]
-        cols = r.json()["dividends"]["columns"]
+        div = get_json(f"https://iss.moex.com/iss/securities/{ticker}/dividends.json", ttl=DIVIDENDS_TTL)["dividends"]
+        data, cols = div["data"], div["columns"]
         return [{"date": row[cols.index("registryclosedate")], "value": row[cols.index("value")]} for row in data if row[cols.index("registryclosedate")]]
     except: return []
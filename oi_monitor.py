@@ -5,6 +5,7 @@ from datetime import datetime
 from brain import get_oi_signal
 from signal_utils import log_signal
 from config import TG_BOT_TOKEN as BOT_TOKEN, TG_CHAT_ID as CHAT_ID
+from price_store import open_store
 
 def send_tg(msg):
     try:
@@ -12,6 +13,10 @@ def send_tg(msg):
     except: pass
 
 def get_price(ticker):
+    store = open_store(ticker=ticker)
+    if store is not None:
+        close = store.close(ticker, 1)
+        return float(close[0]) if len(close) else 0
     try:
         conn = sqlite3.connect("history.db")
         cur = conn.cursor()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+PRICE STORE - колоночный снимок таблицы prices
+Даты, close и volume каждого тикера лежат подряд в memmap-файлах,
+index.json хранит [offset, length, capacity] тикера и версию его строк в prices
+(price_versions, её ведут триггеры history_loader) — по ней снимок знает, что устарел.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HISTORY_DB = "history.db"
+STORE_DIR = "price_store"
+HEADROOM = 256          # запас строк на тикер (~год торгов) под дозапись
+COLUMNS = {"dates": "M8[D]", "close": "f8", "volume": "i8"}
+
+_opened = {}
+
+class PriceStore:
+    def __init__(self, path=STORE_DIR):
+        self.path = path
+        with open(os.path.join(path, "index.json")) as f:
+            self.meta = json.load(f)
+        self.index = {t: tuple(v) for t, v in self.meta["tickers"].items()}
+        self.tickers = sorted(self.index)
+        size = self.meta["size"]
+        self.cols = {name: np.memmap(os.path.join(path, name + ".bin"), dtype=dt, mode="r", shape=(size,))
+                     for name, dt in COLUMNS.items()}
+
+    def _slice(self, name, ticker, n=None):
+        if ticker not in self.index:
+            return self.cols[name][:0]
+        offset, length, _ = self.index[ticker]
+        start = offset + length - n if n and n < length else offset
+        return self.cols[name][start:offset + length]
+
+    def dates(self, ticker, n=None):
+        return self._slice("dates", ticker, n)
+
+    def close(self, ticker, n=None):
+        return self._slice("close", ticker, n)
+
+    def volume(self, ticker, n=None):
+        return self._slice("volume", ticker, n)
+
+    def window(self, name, n, tickers=None):
+        """Последние n значений по всем тикерам: матрица (тикеры x n), NaN там, где истории меньше"""
+        tickers = tickers or self.tickers
+        offsets = np.array([self.index.get(t, (0, 0, 0))[0] for t in tickers])
+        lengths = np.array([self.index.get(t, (0, 0, 0))[1] for t in tickers])
+        pos = (offsets + lengths)[:, None] - n + np.arange(n)
+        valid = pos >= offsets[:, None]
+        out = self.cols[name][np.where(valid, pos, 0)].astype("f8")
+        out[~valid] = np.nan
+        return tickers, out
+
+def _write_meta(path, meta):
+    tmp = os.path.join(path, "index.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, "index.json"))
+
+def _versions(conn, ticker=None):
+    """{ticker: (version, edited)} из price_versions; {} у базы без неё"""
+    sql, args = "SELECT ticker, version, edited FROM price_versions", ()
+    if ticker is not None:
+        sql, args = sql + " WHERE ticker=?", (ticker,)
+    try:
+        return {r[0]: (r[1], r[2]) for r in conn.execute(sql, args)}
+    except sqlite3.OperationalError:
+        return {}
+
+def build(db=HISTORY_DB, path=STORE_DIR, headroom=HEADROOM):
+    """Полная сборка снимка из prices"""
+    conn = sqlite3.connect(db)
+    # версии читаем до строк: строк может оказаться больше, чем в версии, но не меньше
+    versions = _versions(conn)
+    counts = conn.execute("SELECT ticker, COUNT(*) FROM prices GROUP BY ticker ORDER BY ticker").fetchall()
+    tickers, offset = {}, 0
+    for ticker, n in counts:
+        tickers[ticker] = [offset, n, n + headroom]
+        offset += n + headroom
+    os.makedirs(path, exist_ok=True)
+    cols = {name: np.memmap(os.path.join(path, name + ".bin"), dtype=dt, mode="w+", shape=(max(offset, 1),))
+            for name, dt in COLUMNS.items()}
+    for ticker, (start, n, _) in tickers.items():
+        rows = conn.execute("SELECT date, close, volume FROM prices WHERE ticker=? ORDER BY date", (ticker,)).fetchall()
+        dates, close, volume = zip(*rows)
+        cols["dates"][start:start + n] = np.array(dates, dtype="M8[D]")
+        cols["close"][start:start + n] = close
+        cols["volume"][start:start + n] = volume
+    conn.close()
+    for col in cols.values():
+        col.flush()
+    _write_meta(path, {"size": max(offset, 1), "tickers": tickers,
+                       "versions": {t: versions.get(t, (None,))[0] for t in tickers}})
+    _opened.pop(path, None)
+    return len(tickers), sum(v[1] for v in tickers.values())
+
+def update(db=HISTORY_DB, path=STORE_DIR):
+    """Дописывает новые даты тикерам, чья версия в prices сменилась; если после записанной версии
+    была правка задним числом (edited), тикер переписывается целиком.
+    Полная пересборка, если появился тикер или кончился запас. Возвращает (тикеров, записано строк)"""
+    if np is None:
+        return None
+    if not os.path.exists(os.path.join(path, "index.json")):
+        return build(db, path)
+    with open(os.path.join(path, "index.json")) as f:
+        meta = json.load(f)
+    size = meta["size"]
+    cols = {name: np.memmap(os.path.join(path, name + ".bin"), dtype=dt, mode="r+", shape=(size,))
+            for name, dt in COLUMNS.items()}
+    conn = sqlite3.connect(db)
+    versions = _versions(conn)
+    known = set(versions) or {r[0] for r in conn.execute("SELECT DISTINCT ticker FROM prices")}
+    if known - set(meta["tickers"]) or "versions" not in meta:
+        conn.close()
+        return build(db, path)
+    added = 0
+    for ticker, (offset, length, capacity) in meta["tickers"].items():
+        version, edited = versions.get(ticker, (None, None))
+        stored = meta["versions"].get(ticker)
+        if version is not None and stored == version:
+            continue
+        if version is None or stored is None or stored < edited:
+            length = 0
+        meta["versions"][ticker] = version
+        last = str(cols["dates"][offset + length - 1]) if length else ""
+        rows = conn.execute("SELECT date, close, volume FROM prices WHERE ticker=? AND date>? ORDER BY date",
+                            (ticker, last)).fetchall()
+        meta["tickers"][ticker][1] = length
+        if not rows:
+            continue
+        if length + len(rows) > capacity:
+            conn.close()
+            return build(db, path)
+        dates, close, volume = zip(*rows)
+        end = offset + length
+        cols["dates"][end:end + len(rows)] = np.array(dates, dtype="M8[D]")
+        cols["close"][end:end + len(rows)] = close
+        cols["volume"][end:end + len(rows)] = volume
+        meta["tickers"][ticker][1] += len(rows)
+        added += len(rows)
+    conn.close()
+    for col in cols.values():
+        col.flush()
+    _write_meta(path, meta)
+    _opened.pop(path, None)
+    return len(meta["tickers"]), added
+
+def open_store(path=STORE_DIR, db=HISTORY_DB, ticker=None):
+    """Снимок, если он собран и тикер (без ticker — все тикеры) не менялся в prices после записи;
+    иначе None (читаем SQL)"""
+    if np is None or not os.path.exists(db):
+        return None
+    try:
+        conn = sqlite3.connect(db)
+        try:
+            current = {t: v[0] for t, v in _versions(conn, ticker).items()}
+        finally:
+            conn.close()
+        if not current:
+            return None
+        store = _opened.get(path)
+        for _ in range(2):
+            if store is None:
+                store = _opened[path] = PriceStore(path)
+            if all(store.meta["versions"].get(t) == v for t, v in current.items()):
+                return store
+            # снимок мог обновить другой процесс — перечитываем index.json один раз
+            store = None
+        return None
+    except (OSError, ValueError, KeyError, sqlite3.Error):
+        return None
+
+if __name__ == "__main__":
+    start = time.time()
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        n, rows = build()
+        print("Built:", n, "tickers,", rows, "rows")
+    else:
+        n, rows = update()
+        print("Updated:", n, "tickers,", rows, "rows written")
+    print("Time:", round(time.time() - start, 2), "s")
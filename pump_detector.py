@@ -5,7 +5,14 @@ PUMP DETECTOR v1.0
 """
 
 import sqlite3
+import sys
 from datetime import datetime
+try:
+    import numpy as np
+except ImportError:
+    np = None
+from price_store import open_store
+import indicators
 
 HISTORY_DB = "history.db"
 KNOWLEDGE_DB = "knowledge.db"
@@ -27,6 +34,16 @@ DELTA_STRONG = 20.0     # дельта > 20% от объёма
 
 def get_volume_ratio(ticker):
     """Отношение текущего объёма к среднему за 20 дней"""
+    ind = indicators.get(ticker, "vol20", HISTORY_DB)
+    if ind:
+        vol_avg, _, vol_now = ind
+        return volume_stats(int(vol_now), vol_avg)
+    store = open_store(db=HISTORY_DB, ticker=ticker)
+    if store is not None:
+        vols = store.volume(ticker, 20)
+        if not len(vols): return 0, 0, 0
+        return volume_stats(int(vols[-1]), int(vols.sum()) / len(vols))
+
     conn = sqlite3.connect(HISTORY_DB)
     cur = conn.cursor()
     
@@ -44,9 +61,13 @@ def get_volume_ratio(ticker):
             WHERE ticker=? ORDER BY date DESC LIMIT 20
         )
     """, (ticker,))
-    vol_avg = cur.fetchone()[0] or 1
+    vol_avg = cur.fetchone()[0]
     conn.close()
     
+    return volume_stats(vol_now, vol_avg)
+
+def volume_stats(vol_now, vol_avg):
+    vol_avg = vol_avg or 1
     return vol_now, int(vol_avg), round(vol_now / vol_avg, 2)
 
 def get_oi_change(ticker):
@@ -61,6 +82,9 @@ def get_oi_change(ticker):
     row = cur.fetchone()
     conn.close()
     
+    return oi_stats(row)
+
+def oi_stats(row):
     if not row: return 0, 0, 0
     oi, oi_change = row
     oi_prev = oi - oi_change if oi_change else oi
@@ -80,6 +104,9 @@ def get_delta(ticker):
     row = cur.fetchone()
     conn.close()
     
+    return delta_stats(row)
+
+def delta_stats(row):
     if not row: return 0, 0
     longs, shorts = row
     delta = longs - shorts
@@ -127,6 +154,96 @@ def detect_pump(ticker):
         'is_pump': score >= 50
     }
 
+# === BATCH SCAN ===
+
+def _latest_by_prefix(cur, table, cols, tickers):
+    """Последняя строка table для каждого префикса тикера (как LIKE 'T%' ... LIMIT 1)"""
+    values = ",".join("(?)" for _ in tickers)
+    # сначала последняя строка каждого контракта, потом префиксы по ним
+    cur.execute(f"""
+        WITH t(ticker) AS (VALUES {values}),
+        last AS (
+            SELECT * FROM (
+                SELECT ticker AS contract, date, rowid AS rid, {cols}, ROW_NUMBER() OVER (
+                    PARTITION BY ticker ORDER BY date DESC, rowid) rn
+                FROM {table}
+            ) WHERE rn = 1
+        )
+        SELECT ticker, {cols} FROM (
+            SELECT t.ticker, {cols}, ROW_NUMBER() OVER (
+                PARTITION BY t.ticker ORDER BY last.date DESC, last.rid) rn
+            FROM t JOIN last ON last.contract LIKE t.ticker || '%'
+        ) WHERE rn = 1
+    """, tickers)
+    return {r[0]: r[1:] for r in cur.fetchall()}
+
+def detect_all(tickers=TICKERS):
+    """detect_pump() для всех тикеров за три запроса"""
+    tickers = list(tickers)
+    conn = sqlite3.connect(HISTORY_DB)
+    cur = conn.cursor()
+    marks = ",".join("?" for _ in tickers)
+    cur.execute(f"""
+        SELECT ticker, MAX(CASE WHEN rn = 1 THEN volume END), AVG(volume) FROM (
+            SELECT ticker, volume, ROW_NUMBER() OVER (
+                PARTITION BY ticker ORDER BY date DESC) rn
+            FROM prices WHERE ticker IN ({marks})
+        ) WHERE rn <= 20 GROUP BY ticker
+    """, tickers)
+    vols = {r[0]: r[1:] for r in cur.fetchall()}
+    ois = _latest_by_prefix(cur, "futures_oi", "oi, oi_change", tickers)
+    deltas = _latest_by_prefix(cur, "futoi", "pos_long, pos_short", tickers)
+    conn.close()
+    
+    vol = [volume_stats(*vols[t]) if t in vols else (0, 0, 0) for t in tickers]
+    oi = [oi_stats(ois.get(t)) for t in tickers]
+    delta = [delta_stats(deltas.get(t)) for t in tickers]
+    score = calc_pump_scores([v[2] for v in vol], [o[2] for o in oi], [d[1] for d in delta])
+    
+    results = []
+    for i, t in enumerate(tickers):
+        results.append({
+            'ticker': t,
+            'volume': vol[i][0],
+            'volume_avg': vol[i][1],
+            'volume_ratio': vol[i][2],
+            'oi': oi[i][0],
+            'oi_change_pct': oi[i][2],
+            'delta': delta[i][0],
+            'delta_pct': delta[i][1],
+            'pump_score': score[i],
+            'is_pump': score[i] >= 50
+        })
+    return results
+
+def calc_pump_scores(vol_ratio, oi_pct, delta_pct):
+    """calc_pump_score() над массивами; без numpy — поэлементно"""
+    if np is None:
+        return [calc_pump_score(*x) for x in zip(vol_ratio, oi_pct, delta_pct)]
+    vol_ratio, oi_pct, delta_pct = (np.asarray(x, dtype=float) for x in (vol_ratio, oi_pct, delta_pct))
+    score = np.where(vol_ratio >= VOLUME_SPIKE, np.minimum(33, (vol_ratio - 1) * 10), 0)
+    score = score + np.where(oi_pct >= OI_SPIKE, np.minimum(33, oi_pct / 2), 0)
+    score = score + np.where(delta_pct >= DELTA_STRONG, np.minimum(34, delta_pct), 0)
+    # np.round округляет иначе, чем round(), — итог должен совпасть с calc_pump_score
+    return [round(x, 1) for x in score.tolist()]
+
+def save_pump_signals(pumps):
+    """Сохраняем пачку сигналов одной транзакцией"""
+    if not pumps:
+        return
+    dt = datetime.now().isoformat()
+    conn = sqlite3.connect(KNOWLEDGE_DB)
+    with conn:
+        conn.executemany("""
+            INSERT INTO pump_signals 
+            (dt, ticker, volume, volume_avg, volume_ratio, 
+             oi, oi_prev, oi_change_pct, delta, delta_pct, pump_score)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?)
+        """, [(dt, d['ticker'], d['volume'], d['volume_avg'], d['volume_ratio'],
+               d['oi'], d.get('oi_prev', 0), d['oi_change_pct'], d['delta'],
+               d['delta_pct'], d['pump_score']) for d in pumps])
+    conn.close()
+
 def save_pump_signal(data):
     """Сохраняем в БД"""
     if data['pump_score'] < 30:
@@ -154,20 +271,41 @@ def save_pump_signal(data):
     conn.commit()
     conn.close()
 
-def scan_all():
+def scan_all(batch=True):
     """Сканируем все тикеры"""
     pumps = []
-    for t in TICKERS:
-        r = detect_pump(t)
+    results = detect_all(TICKERS) if batch else map(detect_pump, TICKERS)
+    for r in results:
         if r['pump_score'] >= 30:
             pumps.append(r)
-            save_pump_signal(r)
-            print(f"{'🚀' if r['is_pump'] else '⚡'} {t}: score={r['pump_score']}")
+            if not batch:
+                save_pump_signal(r)
+            print(f"{'🚀' if r['is_pump'] else '⚡'} {r['ticker']}: score={r['pump_score']}")
             print(f"   vol={r['volume_ratio']}x oi={r['oi_change_pct']}% delta={r['delta_pct']}%")
+    if batch:
+        save_pump_signals(pumps)
     
     return pumps
 
+def bench(repeat=20):
+    """Поштучный detect_pump() против detect_all() на текущей history.db"""
+    import time
+    start = time.time()
+    for _ in range(repeat):
+        single = [detect_pump(t) for t in TICKERS]
+    t_single = (time.time() - start) / repeat
+    start = time.time()
+    for _ in range(repeat):
+        batch = detect_all(TICKERS)
+    t_batch = (time.time() - start) / repeat
+    print(f"per-ticker: {t_single * 1000:.1f} ms, batch: {t_batch * 1000:.1f} ms, x{t_single / t_batch:.1f}")
+    print("match:", single == batch)
+    return single == batch
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        bench()
+        sys.exit()
     print("=" * 50)
     print(f"PUMP DETECTOR: {datetime.now().strftime('%H:%M:%S')}")
     print("=" * 50)
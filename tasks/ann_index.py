@@ -0,0 +1,152 @@
+"""
+ANN Index - IVF (k-means грубый квантователь) для косинусного поиска
+nprobe — ручка точность/скорость: сколько ближайших кластеров просматривать.
+Индекс хранит только центроиды и номера строк по кластерам: векторы остаются у вызывающего
+(матрица или memmap), search читает из неё лишь строки просмотренных кластеров.
+"""
+import os
+import sys
+import time
+import numpy as np
+
+class IVFIndex:
+    def __init__(self, dim=384, nlist=None, nprobe=8):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.centroids = None
+        self.extra = {}
+
+    @staticmethod
+    def _normalize(x):
+        norms = np.linalg.norm(x, axis=-1, keepdims=True)
+        return (x / np.where(norms > 0, norms, 1)).astype(np.float32)
+
+    def _assign(self, x):
+        out = np.empty(len(x), dtype=np.int64)
+        for i in range(0, len(x), 65536):
+            out[i:i + 65536] = np.argmax(x[i:i + 65536] @ self.centroids.T, axis=1)
+        return out
+
+    def _empty(self):
+        self.lists = [np.empty(0, np.int64) for _ in range(self.nlist)]
+        self.sizes = np.zeros(self.nlist, dtype=np.int64)
+
+    def train(self, vectors, iters=10, seed=0):
+        """Сферический k-means на выборке векторов (матрица или memmap, целиком не копируется)"""
+        n = len(vectors)
+        nlist = self.nlist or int(min(4096, max(16, 4 * np.sqrt(n))))
+        nlist = self.nlist = min(nlist, n)
+        rng = np.random.default_rng(seed)
+        pick = np.sort(rng.choice(n, min(n, 64 * nlist), replace=False))
+        sample = self._normalize(np.asarray(vectors[pick], dtype=np.float32))
+        self.centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iters):
+            labels = self._assign(sample)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, labels, sample)
+            empty = np.bincount(labels, minlength=nlist) == 0
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            self.centroids = self._normalize(sums)
+        self._empty()
+
+    def _append(self, l, rows):
+        n, size = len(rows), self.sizes[l]
+        if size + n > len(self.lists[l]):
+            grown = np.zeros(max(16, 1 << int(size + n - 1).bit_length()), np.int64)
+            grown[:size] = self.lists[l][:size]
+            self.lists[l] = grown
+        self.lists[l][size:size + n] = rows
+        self.sizes[l] += n
+
+    def add(self, rows, vectors):
+        """Разложить строки по кластерам; векторы нужны только для выбора кластера"""
+        rows = np.asarray(rows, dtype=np.int64)
+        labels = self._assign(self._normalize(np.asarray(vectors, dtype=np.float32).reshape(len(rows), self.dim)))
+        order = np.argsort(labels, kind="stable")
+        bounds = np.flatnonzero(np.diff(labels[order])) + 1
+        for group in np.split(order, bounds):
+            if len(group):
+                self._append(int(labels[group[0]]), rows[group])
+
+    def remap(self, keep):
+        """Перенумеровать строки после уплотнения матрицы: keep — старые номера уцелевших строк по возрастанию"""
+        for l in range(self.nlist):
+            rows = self.lists[l][:self.sizes[l]]
+            pos = np.searchsorted(keep, rows)
+            found = pos < len(keep)
+            found[found] = keep[pos[found]] == rows[found]
+            self.lists[l] = pos[found]
+            self.sizes[l] = int(found.sum())
+
+    def __len__(self):
+        return int(self.sizes.sum())
+
+    def search(self, queries, matrix, k=10, nprobe=None, alive=None):
+        """[(rows, scores)] для каждого запроса, по убыванию score.
+        matrix — нормированные векторы по номерам строк, alive — маска строк, которые можно выдавать"""
+        q = self._normalize(np.asarray(queries, dtype=np.float32).reshape(-1, self.dim))
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        probes = np.argpartition(-(q @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        out = []
+        for qi in range(len(q)):
+            rows = [self.lists[l][:self.sizes[l]] for l in probes[qi] if self.sizes[l]]
+            # по возрастанию — чтения из memmap идут по файлу подряд
+            rows = np.sort(np.concatenate(rows)) if rows else np.empty(0, np.int64)
+            if alive is not None:
+                rows = rows[alive[rows]]
+            if not len(rows):
+                out.append((rows, np.empty(0, np.float32)))
+                continue
+            scores = matrix[rows] @ q[qi]
+            kk = min(k, len(rows))
+            top = np.argpartition(-scores, kk - 1)[:kk]
+            top = top[np.argsort(-scores[top])]
+            out.append((rows[top], scores[top]))
+        return out
+
+    def save(self, path, **extra):
+        """Несжатый npz: центроиды и номера строк по кластерам; extra возвращаются в load().extra"""
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, centroids=self.centroids, counts=self.sizes, nprobe=self.nprobe,
+                     rows=np.concatenate([self.lists[l][:self.sizes[l]] for l in range(self.nlist)]), **extra)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        centroids = data["centroids"]
+        index = cls(centroids.shape[1], len(centroids), int(data["nprobe"]))
+        index.centroids = centroids
+        index.extra = {k: data[k] for k in data.files if k not in ("centroids", "counts", "nprobe", "rows")}
+        counts = data["counts"].astype(np.int64)
+        index.lists = np.split(data["rows"], np.cumsum(counts)[:-1])
+        index.sizes = counts
+        return index
+
+def bench(n=200000, dim=384, queries=200, k=10):
+    """recall@k и запросы/сек против точного перебора на кластеризованных векторах"""
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((1000, dim)).astype(np.float32)
+    x = centers[rng.integers(0, 1000, n)] + 1.0 * rng.standard_normal((n, dim)).astype(np.float32)
+    q = x[rng.choice(n, queries, replace=False)] + 0.5 * rng.standard_normal((queries, dim)).astype(np.float32)
+    xn, qn = IVFIndex._normalize(x), IVFIndex._normalize(q)
+    start = time.time()
+    exact = [np.argpartition(-(xn @ v), k - 1)[:k] for v in qn]
+    exact_qps = queries / (time.time() - start)
+    start = time.time()
+    index = IVFIndex(dim)
+    index.train(x)
+    index.add(np.arange(n), x)
+    print(f"n={n} nlist={index.nlist} build={time.time() - start:.1f}s exact={exact_qps:,.0f} q/s")
+    for nprobe in (1, 4, 8, 16, 32):
+        start = time.time()
+        found = index.search(q, xn, k, nprobe)
+        qps = queries / (time.time() - start)
+        recall = np.mean([len(set(f[0]) & set(e)) / k for f, e in zip(found, exact)])
+        print(f"  nprobe={nprobe:<3} recall@{k}={recall:.3f} {qps:,.0f} q/s")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        bench(int(sys.argv[2]) if len(sys.argv) > 2 else 200000)
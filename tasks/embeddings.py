@@ -0,0 +1,100 @@
+"""
+Embedding Service - пакетные эмбеддинги с кэшем по хэшу текста
+"""
+import hashlib
+import os
+import sqlite3
+import numpy as np
+import requests
+
+API_URL = "https://router.huggingface.co/hf-inference/models/sentence-transformers/all-MiniLM-L6-v2/pipeline/feature-extraction"
+DIM = 384
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class LocalModel:
+    """Детерминированная замена MiniLM для тестов: сумма псевдослучайных векторов слов"""
+    def __init__(self, dim=DIM):
+        self.dim = dim
+
+    def _word(self, word):
+        seed = int.from_bytes(hashlib.md5(word.encode("utf-8")).digest()[:4], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+
+    def __call__(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split() or [""]:
+                out[i] += self._word(word)
+        return out
+
+class EmbeddingService:
+    def __init__(self, db_path="embeddings.db", model=None, batch_size=64):
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS vectors (hash TEXT PRIMARY KEY, vec BLOB)")
+        self.db.commit()
+        self.hf_token = os.environ.get("HF_TOKEN")
+        self.api_url = API_URL
+        if model is None and os.environ.get("EMBED_LOCAL"):
+            model = LocalModel()
+        self.model = model
+        self.batch_size = batch_size
+        self.requests = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _remote(self, texts):
+        if not self.hf_token:
+            return None
+        try:
+            r = requests.post(self.api_url, headers={"Authorization": f"Bearer {self.hf_token}"},
+                              json={"inputs": texts}, timeout=60)
+            self.requests += 1
+            if r.status_code == 200:
+                vecs = np.array(r.json(), dtype=np.float32)
+                return vecs.reshape(len(texts), -1)
+        except: pass
+        return None
+
+    def _compute(self, texts):
+        if self.model is not None:
+            self.requests += 1
+            return np.asarray(self.model(texts), dtype=np.float32)
+        return self._remote(texts)
+
+    def embed_many(self, texts):
+        """Векторы для списка текстов; None там, где эмбеддинг недоступен"""
+        hashes = [text_hash(t) for t in texts]
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        for i in range(0, len(unique), 500):
+            chunk = unique[i:i + 500]
+            rows = self.db.execute(
+                f"SELECT hash, vec FROM vectors WHERE hash IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+            found.update((h, np.frombuffer(blob, dtype=np.float32)) for h, blob in rows)
+        self.hits += sum(1 for h in hashes if h in found)
+        todo = {}
+        for h, t in zip(hashes, texts):
+            if h not in found:
+                todo.setdefault(h, t)
+        self.misses += len(todo)
+        todo = list(todo.items())
+        for i in range(0, len(todo), self.batch_size):
+            batch = todo[i:i + self.batch_size]
+            vecs = self._compute([t for _, t in batch])
+            if vecs is None:
+                continue
+            rows = [(h, v.tobytes()) for (h, _), v in zip(batch, vecs)]
+            self.db.executemany("INSERT OR REPLACE INTO vectors VALUES (?,?)", rows)
+            self.db.commit()
+            found.update((h, v) for (h, _), v in zip(batch, vecs))
+        return [found.get(h) for h in hashes]
+
+    def embed(self, text):
+        return self.embed_many([text])[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"requests": self.requests, "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0}
@@ -1,77 +1,408 @@
+import atexit
+import os
 import sqlite3
+import sys
+import threading
+import time
 import numpy as np
-import requests
-import os
+from embeddings import EmbeddingService, LocalModel
+from ann_index import IVFIndex
+from vector_store import VectorStore
+
+ANN_MIN = 50000         # с какого размера базы искать через IVF (обучается в фоне при первом поиске)
+ANN_SAVE_EVERY = 1000   # сохранять IVF на диск раз в столько изменений (и в flush/close/при выходе)
 
 class EpisoddicMemory:
-    def __init__(self, db_path="episodes.db"):
+    def __init__(self, db_path="episodes.db", embedder=None, ann=None, nprobe=8):
+        """ann: None — IVF включается сам от ANN_MIN векторов, True — всегда, False — только точный поиск.
+        Конструктор IVF не читает и не обучает: сохранённый поднимается при первом поиске, новый — build_ann()"""
         self.db = sqlite3.connect(db_path)
-        self.$HF_TOKEN = os.environ.get("HF_TOKEN")
-        self.api_url = "https://router.huggingface.co/hf-inference/models/sentence-transformers/all-MiniLM-L6-v2/pipeline/feature-extraction"
+        self.embedder = embedder or EmbeddingService()
+        self.db.execute("""CREATE TABLE IF NOT EXISTS episodes (
+            id INTEGER PRIMARY KEY, task TEXT, approach TEXT, result TEXT, embedding BLOB)""")
+        # векторы лежат в memmap-файлах рядом с базой, в SQLite — только id -> номер строки
+        self.db.execute("CREATE TABLE IF NOT EXISTS episode_vectors (id INTEGER PRIMARY KEY, row INTEGER)")
+        self.store = None
+        if db_path != ":memory:":
+            self.db.execute("CREATE TABLE IF NOT EXISTS vector_files (gen INTEGER)")
+            gen = self.db.execute("SELECT MAX(gen) FROM vector_files").fetchone()[0] or 0
+            self.store = VectorStore(db_path + ".vec", self.DIM, gen)
+            self.store.cleanup()
+        self.ann_mode = ann
+        self.ann_path = None if db_path == ":memory:" else db_path + ".ivf.npz"
+        self.nprobe = nprobe
+        self.ann = None
+        self._ann_tried = False
+        self._ann_build = None
+        self._ann_changes = 0
+        self._layout = 0
         self._load_index()
+        if self.ann_path:
+            atexit.register(self.close)
     
-    def _load_index(self):
+    DIM = 384
+    
+    def _load_blobs(self):
+        """Векторы из колонки embedding (старый формат и :memory:)"""
         rows = self.db.execute(
             "SELECT id, embedding FROM episodes WHERE embedding IS NOT NULL"
         ).fetchall()
-        self.ids = []
         vectors = []
+        ids = []
         for eid, blob in rows:
             emb = np.frombuffer(blob, dtype=np.float32)
-            if len(emb) == 384:
-                self.ids.append(eid)
+            if len(emb) == self.DIM:
+                ids.append(eid)
                 vectors.append(emb)
-        if vectors:
-            self.matrix = np.vstack(vectors)
-            norms = np.linalg.norm(self.matrix, axis=1, keepdims=True)
-            self.matrix_norm = self.matrix / norms
+        return ids, np.vstack(vectors) if vectors else np.empty((0, self.DIM), np.float32)
+    
+    def _load_index(self):
+        if self.store is None:
+            self._reset(*self._load_blobs())
         else:
-            self.matrix_norm = None
-        print(f"[MEM] Loaded {len(self.ids)} vectors")
+            # файл ids — копия маппинга; сверяем по COUNT/SUM, при расхождении верим SQLite
+            count, total = self.db.execute("SELECT COUNT(*), COALESCE(SUM(id), 0) FROM episode_vectors").fetchone()
+            live = self.store.ids[self.store.ids != 0]
+            # строка в vector_files — миграция уже была; пустой маппинг тогда законен (эпизоды без эмбеддингов)
+            migrated = self.db.execute("SELECT 1 FROM vector_files LIMIT 1").fetchone()
+            if count and not self.store.intact:
+                # маппинг есть, а файлы потеряны или обрезаны
+                self._rebuild_store()
+            elif len(live) == count and int(live.sum()) == total and (
+                    count or migrated or not self.db.execute("SELECT 1 FROM episodes LIMIT 1").fetchone()):
+                self._attach()
+            elif count:
+                mapping = np.array(self.db.execute("SELECT id, row FROM episode_vectors").fetchall(),
+                                   dtype=np.int64)
+                if mapping[:, 1].max() < self.store.capacity:
+                    self.store.ids[:] = 0
+                    self.store.ids[mapping[:, 1]] = mapping[:, 0]
+                    self._attach()
+                else:
+                    self._rebuild_store()
+            else:
+                self._rebuild_store()
+        print(f"[MEM] Loaded {self.size - self.dead} vectors")
     
-    def _embed(self, text):
-        if not self.$HF_TOKEN:
+    def _rebuild_store(self):
+        """Первый запуск на старой базе или потерянные файлы: векторы из BLOB, недостающие — через кэш эмбеддингов.
+        После переноса BLOB обнулены (см. _swap_store), место под них возвращается VACUUM"""
+        ids, vectors = self._load_blobs()
+        migrated = len(ids)
+        have = set(ids)
+        todo = [(eid, task) for eid, task in self.db.execute("SELECT id, task FROM episodes") if eid not in have]
+        embs = self.embedder.embed_many([task for _, task in todo]) if todo else []
+        extra = [(eid, e) for (eid, _), e in zip(todo, embs) if e is not None and len(e) == self.DIM]
+        if extra:
+            ids = ids + [eid for eid, _ in extra]
+            vectors = np.vstack([vectors] + [e for _, e in extra])
+        self._reset(ids, vectors)
+        if migrated:
+            self.db.execute("VACUUM")
+            print(f"[MEM] Moved {migrated} vectors from SQLite BLOBs to {self.store.path}")
+    
+    def _attach(self):
+        """Поднять индекс поверх memmap-файлов: векторы не читаются, id строк — сам файл ids"""
+        rows = np.flatnonzero(self.store.ids)
+        self._buf = self.store.normed
+        self._ids = self.store.ids
+        self.size = int(rows[-1]) + 1 if len(rows) else 0
+        self.dead = self.size - len(rows)
+    
+    # === ИНКРЕМЕНТАЛЬНЫЙ ИНДЕКС ===
+    # Нормированные векторы лежат в заранее выделенной матрице (рост x2), _ids — id эпизода в строке
+    # (0 — надгробие), обратный маппинг id -> строка — таблица episode_vectors.
+    # Строки только дописываются: update пишет вектор в новую строку, старая и удалённая становятся
+    # надгробиями, compact() их вычищает. С memmap-хранилищем матрица и _ids — сами файлы normed и ids.
+    
+    def _reset(self, ids, vectors, keep=None):
+        """Переложить векторы в новую матрицу; keep — старые номера строк, если это уплотнение"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.store is not None:
+            self._swap_store(ids, vectors)
+        else:
+            capacity = max(64, 1 << (len(ids) - 1).bit_length()) if len(ids) else 64
+            self._buf = np.zeros((capacity, self.DIM), dtype=np.float32)
+            self._buf[:len(ids)] = self._normalize(vectors)
+            self._ids = np.zeros(capacity, dtype=np.int64)
+            self._ids[:len(ids)] = ids
+            self.size = len(ids)
+            self.dead = 0
+            with self.db:
+                self.db.execute("DELETE FROM episode_vectors")
+                self.db.executemany("INSERT INTO episode_vectors VALUES (?,?)", zip(ids.tolist(), range(len(ids))))
+        # номера строк сменились: IVF переносим вслед за ними, недообученный в фоне — выбрасываем
+        self._layout += 1
+        if self.ann is not None:
+            if keep is None:
+                self.ann = None
+            else:
+                self.ann.remap(keep)
+                self.save_ann()
+    
+    def _swap_store(self, ids, vectors):
+        """Записать векторы в новое поколение файлов и переключить маппинг одной транзакцией"""
+        store = VectorStore(self.store.path, self.DIM, self.store.gen + 1)
+        store.reserve(len(ids))
+        for i in range(0, len(ids), 65536):
+            chunk = np.asarray(vectors[i:i + 65536], dtype=np.float32)
+            store.raw[i:i + len(chunk)] = chunk
+            store.normed[i:i + len(chunk)] = self._normalize(chunk)
+        store.ids[:] = 0
+        store.ids[:len(ids)] = ids
+        store.flush()
+        with self.db:
+            self.db.execute("DELETE FROM episode_vectors")
+            self.db.executemany("INSERT INTO episode_vectors VALUES (?,?)", zip(ids.tolist(), range(len(ids))))
+            self.db.execute("DELETE FROM vector_files")
+            self.db.execute("INSERT INTO vector_files VALUES (?)", (store.gen,))
+            # векторы теперь только в файлах: BLOB старого формата обнуляются вместе с переключением
+            self.db.execute("UPDATE episodes SET embedding=NULL WHERE embedding IS NOT NULL")
+        self.store.drop()
+        self.store = store
+        self._attach()
+    
+    @staticmethod
+    def _normalize(vectors):
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1)
+    
+    @property
+    def matrix_norm(self):
+        return self._buf[:self.size] if self.size > self.dead else None
+    
+    def _row(self, eid):
+        row = self.db.execute("SELECT row FROM episode_vectors WHERE id=?", (eid,)).fetchone()
+        return row[0] if row else None
+    
+    def _index_put(self, eid, emb):
+        if emb is None or len(emb) != self.DIM:
+            self._index_drop(eid)
+            return
+        old = self._row(eid)
+        if old is not None:
+            self._ids[old] = 0
+            self.dead += 1
+        if self.size == len(self._buf):
+            self._grow()
+        row = self.size
+        self.size += 1
+        self._buf[row] = self._normalize(emb)
+        self._ids[row] = eid
+        if self.store is not None:
+            self.store.raw[row] = emb
+        self.db.execute("INSERT OR REPLACE INTO episode_vectors VALUES (?,?)", (eid, row))
+        if self.ann is not None:
+            self.ann.add([row], self._buf[row])
+            self._ann_touch()
+        self._maybe_compact()
+    
+    def _index_drop(self, eid):
+        row = self._row(eid)
+        if row is None:
+            return
+        # строка остаётся в кластере IVF, поиск отсекает её по _ids
+        self._ids[row] = 0
+        self._buf[row] = 0
+        self.dead += 1
+        self.db.execute("DELETE FROM episode_vectors WHERE id=?", (eid,))
+        self._maybe_compact()
+    
+    def _maybe_compact(self):
+        if self.dead > 1024 and self.dead * 4 > self.size:
+            self.compact()
+    
+    def _grow(self):
+        capacity = len(self._buf) * 2
+        if self.store is not None:
+            self.store.reserve(capacity)
+            self._buf = self.store.normed
+            self._ids = self.store.ids
+        else:
+            buf = np.zeros((capacity, self.DIM), dtype=np.float32)
+            buf[:self.size] = self._buf[:self.size]
+            self._buf = buf
+            ids = np.zeros(capacity, dtype=np.int64)
+            ids[:self.size] = self._ids[:self.size]
+            self._ids = ids
+    
+    def compact(self):
+        """Убрать надгробия из матрицы"""
+        keep = np.flatnonzero(self._ids[:self.size])
+        vectors = self._buf[keep] if self.store is None else self.store.raw[keep]
+        self._load_ann()
+        self._reset(self._ids[keep], vectors, keep)
+    
+    def flush(self):
+        """Сбросить memmap-файлы и IVF на диск"""
+        if self.store is not None:
+            self.store.flush()
+        self.save_ann()
+    
+    def close(self):
+        if self.db is None:
+            return
+        self.flush()
+        self.db.close()
+        self.db = None
+        atexit.unregister(self.close)
+    
+    # === ANN (IVF) ===
+    # IVF хранит номера строк матрицы: строка не меняется, пока жива, поэтому файл индекса помнит
+    # поколение файлов (gen) и число строк на момент сохранения (upto) — всё, что дописано позже,
+    # раскладывается по кластерам при загрузке, удалённое отсекается по _ids при поиске.
+    
+    def _load_ann(self):
+        """Сохранённый IVF — один раз, при первой надобности"""
+        if self.ann is not None or self._ann_tried or not self.ann_path:
+            return
+        self._ann_tried = True
+        try:
+            index = IVFIndex.load(self.ann_path)
+            gen, upto = int(index.extra["gen"]), int(index.extra["upto"])
+        except (OSError, KeyError, ValueError):
+            return
+        if gen != self.store.gen or upto > self.size:
+            return
+        rows = np.arange(upto, self.size)
+        rows = rows[self._ids[rows] != 0]
+        if len(rows):
+            index.add(rows, self._buf[rows])
+        index.nprobe = self.nprobe
+        self.ann = index
+    
+    def _search_ann(self):
+        """IVF для поиска или None (тогда точный перебор). Без сохранённого индекса он строится:
+        при ann=True — сразу, при ann=None от ANN_MIN векторов — в фоне, поиск пока идёт перебором"""
+        if self.ann_mode is False:
             return None
-        headers = {"Authorization": f"Bearer {self.$HF_TOKEN}"}
-        r = requests.post(self.api_url, headers=headers, json={"inputs": text}, timeout=15)
-        if r.status_code == 200:
-            return np.array(r.json(), dtype=np.float32)
-        return None
+        if self._ann_build is not None and not self._ann_build[0].is_alive():
+            self._adopt_ann()
+        self._load_ann()
+        if self.ann is None and self._ann_build is None:
+            if self.ann_mode:
+                self.build_ann()
+            elif self.size - self.dead >= ANN_MIN:
+                self.build_ann(wait=False)
+        return self.ann
+    
+    def build_ann(self, wait=True):
+        """Обучить IVF на текущих векторах и сохранить рядом с базой; wait=False — в фоновом потоке"""
+        rows = np.flatnonzero(self._ids[:self.size])
+        if not len(rows):
+            return
+        buf, job = self._buf, {"layout": self._layout, "upto": self.size}
+        
+        def train():
+            index = IVFIndex(self.DIM, nprobe=self.nprobe)
+            index.train(buf[rows])
+            for i in range(0, len(rows), 65536):
+                index.add(rows[i:i + 65536], buf[rows[i:i + 65536]])
+            job["index"] = index
+        
+        if wait:
+            train()
+            self._ann_build = (None, job)
+            self._adopt_ann()
+        else:
+            # матрица только дописывается, так что поток читает её без блокировок
+            thread = threading.Thread(target=train, daemon=True)
+            self._ann_build = (thread, job)
+            thread.start()
+    
+    def _adopt_ann(self):
+        """Забрать обученный индекс: доложить строки, дописанные за время обучения"""
+        _, job = self._ann_build
+        self._ann_build = None
+        if "index" not in job or job["layout"] != self._layout:
+            return   # обучение упало или строки перенумерованы — соберётся заново при следующем поиске
+        rows = np.arange(job["upto"], self.size)
+        rows = rows[self._ids[rows] != 0]
+        if len(rows):
+            job["index"].add(rows, self._buf[rows])
+        self.ann = job["index"]
+        self.save_ann()
+    
+    def save_ann(self):
+        if self.ann is not None and self.ann_path:
+            self.ann.save(self.ann_path, gen=self.store.gen, upto=self.size)
+        self._ann_changes = 0
+    
+    def _ann_touch(self):
+        self._ann_changes += 1
+        if self._ann_changes >= ANN_SAVE_EVERY:
+            self.save_ann()
+    
+    def _embed(self, text):
+        return self.embedder.embed(text)
     
     def search(self, query, k=5):
         """Семантический поиск похожих эпизодов"""
-        if self.matrix_norm is None or len(self.ids) == 0:
-            return []
-        q_emb = self._embed(query)
-        if q_emb is None:
-            return []
-        q_norm = q_emb / np.linalg.norm(q_emb)
-        scores = self.matrix_norm @ q_norm
-        top_k = np.argsort(scores)[::-1][:k]
-        results = []
-        for idx in top_k:
-            db_id = self.ids[idx]
-            row = self.db.execute(
-                "SELECT task, approach, result FROM episodes WHERE id=?", (db_id,)
-            ).fetchone()
-            if row:
-                results.append({
-                    "id": db_id, "task": row[0], "approach": row[1],
-                    "result": row[2], "score": float(scores[idx])
-                })
+        return self.search_many([query], k)[0]
+    
+    def _exact(self, q_norm, valid, k):
+        """Точный top-k перебором по всей матрице"""
+        dead = self._ids[:self.size] == 0
+        hits = []
+        # блоками, чтобы матрица scores не разрасталась на больших базах
+        block = max(1, (1 << 24) // self.size)
+        for start in range(0, len(valid), block):
+            scores = q_norm[start:start + block] @ self.matrix_norm.T
+            scores[:, dead] = -np.inf
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            for j in range(len(top)):
+                hits.append((valid[start + j], list(zip(self._ids[top[j]].tolist(), top_scores[j].tolist()))))
+        return hits
+    
+    def search_many(self, queries, k=5):
+        """Поиск для пачки запросов: один батч эмбеддингов, одно матричное умножение, один SELECT"""
+        results = [[] for _ in queries]
+        if self.matrix_norm is None:
+            return results
+        embs = self.embedder.embed_many(list(queries))
+        valid = [i for i, e in enumerate(embs) if e is not None and len(e) == self.DIM]
+        k = min(k, self.size - self.dead)
+        if not valid or k <= 0:
+            return results
+        q_norm = self._normalize(np.vstack([embs[i] for i in valid]))
+        hits = []
+        ann = self._search_ann()
+        if ann is not None:
+            alive = self._ids[:self.size] != 0
+            for j, (rows, scores) in enumerate(ann.search(q_norm, self._buf, k, self.nprobe, alive)):
+                hits.append((valid[j], list(zip(self._ids[rows].tolist(), scores.tolist()))))
+        else:
+            hits = self._exact(q_norm, valid, k)
+        wanted = list({eid for _, row in hits for eid, _ in row})
+        episodes = {}
+        for i in range(0, len(wanted), 900):
+            chunk = wanted[i:i + 900]
+            for eid, task, approach, result in self.db.execute(
+                f"SELECT id, task, approach, result FROM episodes WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ):
+                episodes[eid] = (task, approach, result)
+        for qi, row in hits:
+            results[qi] = [{
+                "id": eid, "task": episodes[eid][0], "approach": episodes[eid][1],
+                "result": episodes[eid][2], "score": score
+            } for eid, score in row if eid in episodes]
         return results
     
     def add(self, task, approach, result):
         """Добавить новый эпизод"""
         emb = self._embed(task)
-        blob = emb.tobytes() if emb is not None else None
+        blob = emb.tobytes() if emb is not None and self.store is None else None
         cur = self.db.execute(
             "INSERT INTO episodes (task, approach, result, embedding) VALUES (?,?,?,?)",
             (task, approach, result, blob)
         )
+        if emb is not None:
+            self._index_put(cur.lastrowid, emb)
         self.db.commit()
-        if blob:
-            self._load_index()
         return cur.lastrowid
     
     def get(self, episode_id):
@@ -93,31 +424,38 @@ class EpisoddicMemory:
     def delete(self, episode_id):
         """Удалить эпизод"""
         self.db.execute("DELETE FROM episodes WHERE id=?", (episode_id,))
+        self._index_drop(episode_id)
         self.db.commit()
-        self._load_index()
     
     def update(self, episode_id, task=None, approach=None, result=None):
         """Обновить эпизод"""
         ep = self.get(episode_id)
         if not ep:
             return False
-        task = task or ep["task"]
         approach = approach or ep["approach"]
         result = result or ep["result"]
+        if not task or task == ep["task"]:
+            # текст задачи тот же — эмбеддинг не трогаем
+            self.db.execute(
+                "UPDATE episodes SET approach=?, result=? WHERE id=?",
+                (approach, result, episode_id)
+            )
+            self.db.commit()
+            return True
         emb = self._embed(task)
-        blob = emb.tobytes() if emb is not None else None
+        blob = emb.tobytes() if emb is not None and self.store is None else None
         self.db.execute(
             "UPDATE episodes SET task=?, approach=?, result=?, embedding=? WHERE id=?",
             (task, approach, result, blob, episode_id)
         )
+        self._index_put(episode_id, emb)
         self.db.commit()
-        self._load_index()
         return True
     
     def stats(self):
         """Статистика базы"""
         total = self.db.execute("SELECT COUNT(*) FROM episodes").fetchone()[0]
-        with_emb = self.db.execute("SELECT COUNT(*) FROM episodes WHERE embedding IS NOT NULL").fetchone()[0]
+        with_emb = self.size - self.dead
         unique_tasks = self.db.execute("SELECT COUNT(DISTINCT task) FROM episodes").fetchone()[0]
         return {"total": total, "with_embedding": with_emb, "unique_tasks": unique_tasks}
     
@@ -125,3 +463,63 @@ class EpisoddicMemory:
     add_episode = add
 
 EpisodicMemory = EpisoddicMemory
+
+def bench(n=20000, steps=5):
+    """Время вставки по долям: при инкрементальном индексе скорость не падает с ростом базы"""
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        mem = EpisodicMemory(os.path.join(tmp, "episodes.db"),
+                             EmbeddingService(os.path.join(tmp, "embeddings.db"), LocalModel()))
+        mem.db.execute("PRAGMA synchronous=OFF")
+        chunk = n // steps
+        for step in range(steps):
+            start = time.time()
+            for i in range(step * chunk, (step + 1) * chunk):
+                mem.add(f"task {i} fix {i % 97} parser", "approach", "result")
+            elapsed = time.time() - start
+            print(f"{(step + 1) * chunk:>8} episodes: {chunk / elapsed:,.0f} inserts/sec")
+        mem.close()
+
+def bench_startup(sizes=(10000, 50000, 120000)):
+    """Холодный старт с настройками по умолчанию: разбор BLOB из SQLite против memmap-хранилища"""
+    import tempfile
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "episodes.db")
+            db = sqlite3.connect(path)
+            db.execute("CREATE TABLE episodes (id INTEGER PRIMARY KEY, task TEXT, approach TEXT, result TEXT, embedding BLOB)")
+            vectors = rng.standard_normal((n, EpisodicMemory.DIM)).astype(np.float32)
+            db.executemany("INSERT INTO episodes (task, approach, result, embedding) VALUES (?,?,?,?)",
+                           ((f"task {i}", "approach", "result", v.tobytes()) for i, v in enumerate(vectors)))
+            db.commit()
+            start = time.time()
+            blobs = db.execute("SELECT embedding FROM episodes").fetchall()
+            EpisodicMemory._normalize(np.vstack([np.frombuffer(b, np.float32) for b, in blobs]))
+            blobs = time.time() - start
+            db.close()
+            before = os.path.getsize(path)
+            embedder = EmbeddingService(os.path.join(tmp, "embeddings.db"), LocalModel())
+            start = time.time()
+            mem = EpisodicMemory(path, embedder)
+            migrate = time.time() - start
+            mem.close()
+            start = time.time()
+            mem = EpisodicMemory(path, embedder)
+            mapped = time.time() - start
+            mem.close()
+            print(f"{n:>8} episodes: blobs {blobs * 1000:,.0f} ms, memmap {mapped * 1000:,.0f} ms "
+                  f"(one-time migration {migrate * 1000:,.0f} ms, db {before >> 20} -> {os.path.getsize(path) >> 20} MB)")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        bench(int(sys.argv[2]) if len(sys.argv) > 2 else 20000)
+    elif len(sys.argv) > 1 and sys.argv[1] == "startup":
+        bench_startup()
+    elif len(sys.argv) > 1 and sys.argv[1] == "build-ann":
+        # явная сборка IVF (иначе он обучается в фоне при первом поиске от ANN_MIN векторов)
+        start = time.time()
+        mem = EpisodicMemory(sys.argv[2] if len(sys.argv) > 2 else "episodes.db", ann=True)
+        mem.build_ann()
+        mem.close()
+        print(f"IVF: {len(mem.ann) if mem.ann else 0} vectors in {time.time() - start:.1f}s")
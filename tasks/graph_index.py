@@ -0,0 +1,179 @@
+"""
+Graph Index - граф памяти в памяти процесса: CSR-смежность + нормированные эмбеддинги узлов
+Строится одним проходом по SQLite, дальше обновляется из link() без перечитывания базы.
+Новые рёбра копятся в хвосте и вливаются в CSR, когда хвост разрастается.
+"""
+import numpy as np
+
+DIM = 384
+
+class CSRGraph:
+    def __init__(self, dim=DIM):
+        self.dim = dim
+        self.n = 0
+        self.pos = {}
+        self.node_ids = np.zeros(64, dtype=np.int64)
+        self.normed = np.zeros((64, dim), dtype=np.float32)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.dst = np.empty(0, dtype=np.int64)
+        self.w = np.empty(0, dtype=np.float64)
+        self.tail = {}
+        self._tail_arrays = None
+
+    @staticmethod
+    def _normalize(x):
+        norms = np.linalg.norm(x, axis=-1, keepdims=True)
+        return x / np.where(norms > 0, norms, 1)
+
+    @classmethod
+    def load(cls, db, dim=DIM):
+        g = cls(dim)
+        nodes = db.execute("SELECT id, embedding FROM nodes ORDER BY id").fetchall()
+        g._reserve(len(nodes))
+        g.n = len(nodes)
+        g.node_ids[:g.n] = [nid for nid, _ in nodes]
+        g.pos = {nid: i for i, (nid, _) in enumerate(nodes)}
+        for i, (_, blob) in enumerate(nodes):
+            if blob and len(blob) == dim * 4:
+                g.normed[i] = np.frombuffer(blob, dtype=np.float32)
+        g.normed[:g.n] = g._normalize(g.normed[:g.n])
+        edges = np.array(db.execute("SELECT src, dst, weight FROM edges").fetchall(), dtype=np.float64).reshape(-1, 3)
+        ids = g.node_ids[:g.n]
+        src = np.searchsorted(ids, edges[:, 0].astype(np.int64))
+        dst = np.searchsorted(ids, edges[:, 1].astype(np.int64))
+        src, dst = np.minimum(src, max(g.n - 1, 0)), np.minimum(dst, max(g.n - 1, 0))
+        ok = (ids[src] == edges[:, 0]) & (ids[dst] == edges[:, 1]) if g.n else np.zeros(len(edges), bool)
+        g._build(src[ok], dst[ok], edges[ok, 2])
+        return g
+
+    def _reserve(self, n):
+        if n <= len(self.node_ids):
+            return
+        capacity = 1 << (n - 1).bit_length()
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[:self.n] = self.node_ids[:self.n]
+        normed = np.zeros((capacity, self.dim), dtype=np.float32)
+        normed[:self.n] = self.normed[:self.n]
+        self.node_ids, self.normed = ids, normed
+
+    def _build(self, src, dst, w):
+        order = np.lexsort((dst, src))
+        self.dst, self.w = dst[order], w[order]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(src, minlength=self.n))]).astype(np.int64)
+        self.tail = {}
+        self._tail_arrays = None
+
+    def _merge(self):
+        """Влить хвост в CSR"""
+        rows = np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+        ts, td, tw = self._tail()
+        self._build(np.concatenate([rows, ts]), np.concatenate([self.dst, td]), np.concatenate([self.w, tw]))
+
+    def _tail(self):
+        if self._tail_arrays is None:
+            keys = np.array(list(self.tail), dtype=np.int64).reshape(-1, 2)
+            self._tail_arrays = keys[:, 0], keys[:, 1], np.array(list(self.tail.values()), dtype=np.float64)
+        return self._tail_arrays
+
+    @property
+    def edges(self):
+        return len(self.dst) + len(self.tail)
+
+    def add_node(self, nid, emb=None):
+        if nid in self.pos:
+            return self.pos[nid]
+        self._reserve(self.n + 1)
+        i = self.pos[nid] = self.n
+        self.node_ids[i] = nid
+        if emb is not None and len(emb) == self.dim:
+            self.normed[i] = self._normalize(np.asarray(emb, dtype=np.float32))
+        self.n += 1
+        return i
+
+    def _find(self, i, j):
+        if i + 1 >= len(self.indptr):
+            return None
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        k = lo + np.searchsorted(self.dst[lo:hi], j)
+        return k if k < hi and self.dst[k] == j else None
+
+    def link(self, src, dst, weight, increment):
+        """Та же семантика, что у UPSERT в edges: новое ребро — weight, существующее — += increment.
+        True, если ребро новое (поменялась структура графа)"""
+        i, j = self.pos[src], self.pos[dst]
+        k = self._find(i, j)
+        if k is not None:
+            self.w[k] += increment
+            return False
+        if (i, j) in self.tail:
+            self.tail[i, j] += increment
+            return False
+        self.tail[i, j] = weight
+        self._tail_arrays = None
+        if len(self.tail) > max(1024, len(self.dst) // 8):
+            self._merge()
+        return True
+
+    def similarity(self, query):
+        q = self._normalize(np.asarray(query, dtype=np.float32))
+        return self.normed[:self.n] @ q
+
+    def _gather(self, nodes):
+        """Номера рёбер CSR, выходящих из nodes, и сколько их у каждого узла"""
+        rows = nodes[nodes < len(self.indptr) - 1]
+        starts = self.indptr[rows]
+        counts = self.indptr[rows + 1] - starts
+        return rows, counts, np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+    def spread(self, act, depth=3, decay=0.7):
+        """Распространение активации: на каждом шаге dst += act[src] * w * decay, потом max со старым"""
+        act = np.asarray(act, dtype=np.float64)
+        for _ in range(depth):
+            rows, counts, idx = self._gather(np.flatnonzero(act))
+            new = np.bincount(self.dst[idx], weights=np.repeat(act[rows], counts) * self.w[idx] * decay,
+                              minlength=self.n)
+            if self.tail:
+                ts, td, tw = self._tail()
+                new += np.bincount(td, weights=act[ts] * tw * decay, minlength=self.n)
+            act = np.maximum(act, new)
+        return act
+
+    def expand(self, frontier):
+        """Все рёбра (src, dst) из узлов frontier"""
+        rows, counts, idx = self._gather(frontier)
+        src, dst = np.repeat(rows, counts), self.dst[idx]
+        if self.tail:
+            ts, td, _ = self._tail()
+            mask = np.isin(ts, frontier)
+            src, dst = np.concatenate([src, ts[mask]]), np.concatenate([dst, td[mask]])
+        return src, dst
+
+    def shortest_path(self, a, b, max_depth=5):
+        """Двусторонний BFS между позициями a и b: список позиций или None.
+        link() пишет рёбра парами, поэтому обратный поиск идёт по тем же спискам смежности."""
+        if a == b:
+            return [a, b] if self._find(a, b) is not None or (a, b) in self.tail else None
+        parent = [np.full(self.n, -1, dtype=np.int64), np.full(self.n, -1, dtype=np.int64)]
+        parent[0][a], parent[1][b] = a, b
+        frontier = [np.array([a]), np.array([b])]
+        depth = 0
+        while depth < max_depth and len(frontier[0]) and len(frontier[1]):
+            side = 0 if len(frontier[0]) <= len(frontier[1]) else 1
+            src, dst = self.expand(frontier[side])
+            fresh = parent[side][dst] < 0
+            dst, first = np.unique(dst[fresh], return_index=True)
+            parent[side][dst] = src[fresh][first]
+            frontier[side] = dst
+            depth += 1
+            meet = dst[parent[1 - side][dst] >= 0]
+            if len(meet):
+                return self._walk(parent[0], meet[0], a)[::-1] + self._walk(parent[1], meet[0], b)[1:]
+        return None
+
+    @staticmethod
+    def _walk(parent, node, root):
+        out = [int(node)]
+        while node != root:
+            node = parent[node]
+            out.append(int(node))
+        return out
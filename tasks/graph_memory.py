@@ -2,17 +2,21 @@
 Graph Memory - Ассоциативная память с распространением активации
 """
 import sqlite3
+import sys
+import time
+from collections import OrderedDict
 import numpy as np
-import requests
-import os
-from collections import defaultdict
+from embeddings import EmbeddingService, LocalModel
+from graph_index import CSRGraph
 
 class GraphMemory:
-    def __init__(self, db_path="graph_memory.db"):
+    def __init__(self, db_path="graph_memory.db", embedder=None):
         self.db = sqlite3.connect(db_path)
-        self.$HF_TOKEN = os.environ.get("HF_TOKEN")
-        self.api_url = "https://router.huggingface.co/hf-inference/models/sentence-transformers/all-MiniLM-L6-v2/pipeline/feature-extraction"
+        self.embedder = embedder or EmbeddingService()
         self._init_db()
+        self.graph = None     # CSRGraph, строится при первом запросе
+        self._active = None   # id узлов с ненулевой activation в базе
+        self.path_cache = OrderedDict()
         
     def _init_db(self):
         self.db.executescript("""
@@ -29,14 +33,7 @@ class GraphMemory:
         self.db.commit()
     
     def _embed(self, text):
-        if not self.$HF_TOKEN:
-            return None
-        try:
-            r = requests.post(self.api_url, headers={"Authorization": f"Bearer {self.$HF_TOKEN}"}, json={"inputs": text}, timeout=15)
-            if r.status_code == 200:
-                return np.array(r.json(), dtype=np.float32)
-        except: pass
-        return None
+        return self.embedder.embed(text)
     
     def _get_or_create_node(self, concept):
         concept = concept.lower().strip()
@@ -46,6 +43,8 @@ class GraphMemory:
         blob = emb.tobytes() if emb is not None else None
         cur = self.db.execute("INSERT INTO nodes (concept, embedding) VALUES (?,?)", (concept, blob))
         self.db.commit()
+        if self.graph is not None:
+            self.graph.add_node(cur.lastrowid, emb)
         return cur.lastrowid
     
     def link(self, a, b, weight=1.0):
@@ -54,60 +53,123 @@ class GraphMemory:
             self.db.execute("""INSERT INTO edges (src, dst, weight, co_occur) VALUES (?,?,?,1)
                 ON CONFLICT(src, dst) DO UPDATE SET weight = weight + ?, co_occur = co_occur + 1
             """, (src, dst, weight, weight * 0.1))
+            if self.graph is None or self.graph.link(src, dst, weight, weight * 0.1):
+                # новое ребро может укоротить любой путь; рост веса на BFS не влияет.
+                # Без загруженного графа новизну ребра не узнать — сбрасываем всегда
+                self.path_cache.clear()
         self.db.commit()
     
     def strengthen(self, concepts):
-        for i, a in enumerate(concepts):
-            for b in concepts[i+1:]:
-                self.link(a, b, weight=0.5)
+        self.ingest([concepts], weight=0.5)
+    
+    def _resolve_nodes(self, concepts):
+        """{concept: id} для всех понятий; новые создаются одним батчем эмбеддингов и одним executemany"""
+        concepts = list(dict.fromkeys(concepts))
+        ids = {}
+        for i in range(0, len(concepts), 900):
+            chunk = concepts[i:i + 900]
+            ids.update(self.db.execute(
+                f"SELECT concept, id FROM nodes WHERE concept IN ({','.join('?' * len(chunk))})", chunk))
+        new = [c for c in concepts if c not in ids]
+        if new:
+            embs = self.embedder.embed_many(new)
+            self.db.executemany("INSERT INTO nodes (concept, embedding) VALUES (?,?)",
+                                [(c, e.tobytes() if e is not None else None) for c, e in zip(new, embs)])
+            for i in range(0, len(new), 900):
+                chunk = new[i:i + 900]
+                ids.update(self.db.execute(
+                    f"SELECT concept, id FROM nodes WHERE concept IN ({','.join('?' * len(chunk))})", chunk))
+            if self.graph is not None:
+                for c, e in zip(new, embs):
+                    self.graph.add_node(ids[c], e)
+        return ids
+    
+    def ingest(self, documents, weight=0.5, batch=1000):
+        """Совместная встречаемость по потоку документов (списков понятий).
+        Итог тот же, что у link() для каждой пары внутри документа, но на пачку из batch документов —
+        один проход по узлам, один батч эмбеддингов и одна транзакция с executemany по рёбрам."""
+        docs = []
+        for doc in documents:
+            docs.append([c.lower().strip() for c in doc])
+            if len(docs) >= batch:
+                self._ingest(docs, weight)
+                docs = []
+        if docs:
+            self._ingest(docs, weight)
+    
+    def _ingest(self, docs, weight):
+        ids = self._resolve_nodes(c for doc in docs for c in doc)
+        pairs = []
+        for doc in docs:
+            if len(doc) < 2:
+                continue
+            nodes = np.array([ids[c] for c in doc], dtype=np.int64)
+            i, j = np.triu_indices(len(nodes), 1)
+            pairs += [np.stack([nodes[i], nodes[j]], 1), np.stack([nodes[j], nodes[i]], 1)]
+        if pairs:
+            edges, counts = np.unique(np.concatenate(pairs), axis=0, return_counts=True)
+            # c повторов link(): новое ребро — weight + (c-1) приростов, старое — c приростов
+            rows = list(zip(edges[:, 0].tolist(), edges[:, 1].tolist(), (weight + weight * 0.1 * (counts - 1)).tolist(),
+                            counts.tolist(), (weight * 0.1 * counts).tolist()))
+            self.db.executemany("""INSERT INTO edges (src, dst, weight, co_occur) VALUES (?,?,?,?)
+                ON CONFLICT(src, dst) DO UPDATE SET weight = weight + ?, co_occur = co_occur + excluded.co_occur
+            """, rows)
+            if self.graph is None or any([self.graph.link(s, d, w, inc) for s, d, w, _, inc in rows]):
+                self.path_cache.clear()
+        self.db.commit()
+    
+    def _load_graph(self):
+        if self.graph is None:
+            self.graph = CSRGraph.load(self.db)
+        return self.graph
     
     def spread(self, query, depth=3, decay=0.7):
-        self.db.execute("UPDATE nodes SET activation = 0")
         q_emb = self._embed(query)
         if q_emb is None: return []
-        rows = self.db.execute("SELECT id, concept, embedding FROM nodes WHERE embedding IS NOT NULL").fetchall()
-        if not rows: return []
-        q_norm = q_emb / np.linalg.norm(q_emb)
-        activations = {}
-        for nid, concept, blob in rows:
-            emb = np.frombuffer(blob, dtype=np.float32)
-            if len(emb) == 384:
-                sim = float(np.dot(emb / np.linalg.norm(emb), q_norm))
-                if sim > 0.3: activations[nid] = sim
-        for _ in range(depth):
-            new_act = defaultdict(float)
-            for nid, act in activations.items():
-                for dst, weight in self.db.execute("SELECT dst, weight FROM edges WHERE src=?", (nid,)).fetchall():
-                    new_act[dst] += act * weight * decay
-            for nid, act in new_act.items():
-                activations[nid] = max(activations.get(nid, 0), act)
-        results = []
-        for nid, act in sorted(activations.items(), key=lambda x: -x[1])[:10]:
-            concept = self.db.execute("SELECT concept FROM nodes WHERE id=?", (nid,)).fetchone()[0]
-            self.db.execute("UPDATE nodes SET activation=?, access_count=access_count+1 WHERE id=?", (act, nid))
-            results.append({"concept": concept, "activation": round(act, 3)})
+        g = self._load_graph()
+        if not g.n: return []
+        sims = g.similarity(q_emb)
+        act = g.spread(np.where(sims > 0.3, sims, 0), depth, decay)
+        top = np.flatnonzero(act)
+        top = top[np.argsort(-act[top], kind="stable")[:10]]
+        ids = g.node_ids[top].tolist()
+        concepts = dict(self.db.execute(
+            f"SELECT id, concept FROM nodes WHERE id IN ({','.join('?' * len(ids))})", ids).fetchall()) if ids else {}
+        # activation в базе: гасим прошлый топ и пишем новый, без прохода по всей таблице
+        if self._active is None:
+            self._active = {r[0] for r in self.db.execute("SELECT id FROM nodes WHERE activation != 0")}
+        self.db.executemany("UPDATE nodes SET activation=0 WHERE id=?", [(nid,) for nid in self._active - set(ids)])
+        self.db.executemany("UPDATE nodes SET activation=?, access_count=access_count+1 WHERE id=?",
+                            [(float(act[i]), nid) for i, nid in zip(top, ids)])
         self.db.commit()
-        return results
+        self._active = set(ids)
+        return [{"concept": concepts[nid], "activation": round(float(act[i]), 3)} for i, nid in zip(top, ids)]
+    
+    PATH_CACHE = 1024
     
     def path(self, a, b, max_depth=5):
-        id_a = self.db.execute("SELECT id FROM nodes WHERE concept=?", (a.lower(),)).fetchone()
-        id_b = self.db.execute("SELECT id FROM nodes WHERE concept=?", (b.lower(),)).fetchone()
+        key = (a.lower(), b.lower(), max_depth)
+        if key in self.path_cache:
+            self.path_cache.move_to_end(key)
+            result = self.path_cache[key]
+            return list(result) if result else None
+        result = self._path(*key)
+        self.path_cache[key] = result
+        if len(self.path_cache) > self.PATH_CACHE:
+            self.path_cache.popitem(last=False)
+        return list(result) if result else None
+    
+    def _path(self, a, b, max_depth):
+        id_a = self.db.execute("SELECT id FROM nodes WHERE concept=?", (a,)).fetchone()
+        id_b = self.db.execute("SELECT id FROM nodes WHERE concept=?", (b,)).fetchone()
         if not id_a or not id_b: return None
-        id_a, id_b = id_a[0], id_b[0]
-        visited = {id_a: [a.lower()]}
-        queue = [id_a]
-        for _ in range(max_depth):
-            if not queue: break
-            new_queue = []
-            for nid in queue:
-                for (dst,) in self.db.execute("SELECT dst FROM edges WHERE src=?", (nid,)).fetchall():
-                    if dst == id_b:
-                        return visited[nid] + [self.db.execute("SELECT concept FROM nodes WHERE id=?", (dst,)).fetchone()[0]]
-                    if dst not in visited:
-                        visited[dst] = visited[nid] + [self.db.execute("SELECT concept FROM nodes WHERE id=?", (dst,)).fetchone()[0]]
-                        new_queue.append(dst)
-            queue = new_queue
-        return None
+        g = self._load_graph()
+        found = g.shortest_path(g.pos[id_a[0]], g.pos[id_b[0]], max_depth)
+        if found is None: return None
+        ids = g.node_ids[found].tolist()
+        concepts = dict(self.db.execute(
+            f"SELECT id, concept FROM nodes WHERE id IN ({','.join('?' * len(ids))})", ids).fetchall())
+        return [concepts[nid] for nid in ids]
     
     def stats(self):
         return {
@@ -124,4 +186,61 @@ class GraphMemory:
         for a, b, w in edges:
             bar = "=" * min(int(w * 5), 20)
             lines.append(f"{a[:15]:15} {bar}> {b[:15]}")
-        return chr(10).join(lines)
\ No newline at end of file
+        return chr(10).join(lines)
+
+def bench(nodes=100000, edges=1000000, queries=20):
+    """Время spread() и path() на синтетическом графе: узлы — 1000 тем с шумом, рёбра случайные"""
+    import os, tempfile
+    rng = np.random.default_rng(0)
+    model = LocalModel()
+    topics = model([f"topic{t}" for t in range(1000)])
+    with tempfile.TemporaryDirectory() as tmp:
+        mem = GraphMemory(os.path.join(tmp, "graph.db"), EmbeddingService(os.path.join(tmp, "emb.db"), model))
+        vecs = topics[np.arange(nodes) % 1000] + 3 * rng.standard_normal((nodes, 384)).astype(np.float32)
+        mem.db.executemany("INSERT INTO nodes (id, concept, embedding) VALUES (?,?,?)",
+                           ((i + 1, f"c{i}", v.tobytes()) for i, v in enumerate(vecs)))
+        pairs = np.unique(np.sort(rng.integers(1, nodes + 1, (edges // 2, 2)), axis=1), axis=0)
+        pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+        weights = rng.uniform(0.1, 1.0, len(pairs))
+        mem.db.executemany("INSERT INTO edges (src, dst, weight) VALUES (?,?,?)",
+                           ((int(a), int(b), float(w)) for (a, b), w in zip(pairs, weights)))
+        mem.db.executemany("INSERT INTO edges (src, dst, weight) VALUES (?,?,?)",
+                           ((int(b), int(a), float(w)) for (a, b), w in zip(pairs, weights)))
+        mem.db.commit()
+        start = time.time()
+        mem._load_graph()
+        print(f"graph: {mem.graph.n} nodes, {mem.graph.edges} edges, load {time.time() - start:.2f}s")
+        start = time.time()
+        for q in range(queries):
+            mem.spread(f"topic{q}")
+        print(f"spread: {(time.time() - start) / queries * 1000:.1f} ms/query")
+        start = time.time()
+        found = 0
+        for q in range(queries):
+            found += mem.path(f"c{q}", f"c{nodes - 1 - q}") is not None
+        print(f"path: {(time.time() - start) / queries * 1000:.1f} ms/query ({found}/{queries} found)")
+
+def bench_ingest(docs=2000, size=30, vocab=20000, legacy=20):
+    """Документы/сек: ingest() против старого strengthen() (link() на каждую пару)"""
+    import os, tempfile
+    rng = np.random.default_rng(0)
+    corpus = [[f"w{x}" for x in rng.integers(0, vocab, size)] for _ in range(docs)]
+    with tempfile.TemporaryDirectory() as tmp:
+        embedder = EmbeddingService(os.path.join(tmp, "emb.db"), LocalModel())
+        mem = GraphMemory(os.path.join(tmp, "old.db"), embedder)
+        start = time.time()
+        for doc in corpus[:legacy]:
+            for i, a in enumerate(doc):
+                for b in doc[i + 1:]:
+                    mem.link(a, b, weight=0.5)
+        print(f"link per pair: {legacy / (time.time() - start):,.1f} docs/sec")
+        mem = GraphMemory(os.path.join(tmp, "new.db"), embedder)
+        start = time.time()
+        mem.ingest(corpus)
+        print(f"ingest:        {docs / (time.time() - start):,.1f} docs/sec ({mem.stats()['edges']} edges)")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        bench(*[int(x) for x in sys.argv[2:4]])
+    elif len(sys.argv) > 1 and sys.argv[1] == "ingest":
+        bench_ingest(*[int(x) for x in sys.argv[2:3]])
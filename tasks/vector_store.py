@@ -0,0 +1,71 @@
+"""
+Vector Store - векторы в плоских файлах под np.memmap
+Старт ничего не читает: файлы отображаются в память, страницы подтягивает ОС.
+raw — векторы как есть, normed — нормированные для косинусного поиска,
+ids — id эпизода в каждой строке (0 — пустая строка или надгробие).
+Файлы поколения gen переписываются только целиком (compact), строки в них дописываются.
+"""
+import glob
+import os
+import numpy as np
+
+class VectorStore:
+    def __init__(self, path, dim=384, gen=0):
+        self.path = path
+        self.dim = dim
+        self.gen = gen
+        # имя -> (dtype, ширина строки)
+        self.kinds = {"raw": (np.float32, dim), "normed": (np.float32, dim), "ids": (np.int64, 1)}
+        os.makedirs(path, exist_ok=True)
+        try:
+            capacity = os.path.getsize(self._file("ids")) // 8
+        except OSError:
+            capacity = 0
+        # все файлы на месте и одной длины; иначе строки из маппинга в SQLite ничем не подкреплены
+        self.intact = capacity > 0 and all(
+            os.path.exists(self._file(kind)) and os.path.getsize(self._file(kind)) == self._nbytes(kind, capacity)
+            for kind in self.kinds)
+        self._map(max(64, capacity))
+
+    def _file(self, kind):
+        return os.path.join(self.path, f"{kind}.{self.gen}.bin")
+
+    def _nbytes(self, kind, capacity):
+        dtype, width = self.kinds[kind]
+        return capacity * width * np.dtype(dtype).itemsize
+
+    def _map(self, capacity):
+        for kind, (dtype, width) in self.kinds.items():
+            name = self._file(kind)
+            nbytes = self._nbytes(kind, capacity)
+            with open(name, "ab") as f:
+                if f.tell() < nbytes:
+                    f.truncate(nbytes)
+            shape = (capacity, width) if width > 1 else (capacity,)
+            setattr(self, kind, np.memmap(name, dtype, "r+", shape=shape))
+        self.capacity = capacity
+
+    def reserve(self, n):
+        """Гарантировать место под n строк (рост степенями двойки)"""
+        if n > self.capacity:
+            self.flush()
+            self._map(1 << (n - 1).bit_length())
+
+    def flush(self):
+        for kind in self.kinds:
+            getattr(self, kind).flush()
+
+    def drop(self):
+        """Удалить файлы этого поколения"""
+        for kind in self.kinds:
+            setattr(self, kind, None)
+            try:
+                os.remove(self._file(kind))
+            except OSError:
+                pass
+
+    def cleanup(self):
+        """Удалить файлы чужих поколений (остатки прерванного compact)"""
+        for name in glob.glob(os.path.join(self.path, "*.bin")):
+            if not name.endswith(f".{self.gen}.bin"):
+                os.remove(name)
@@ -1,6 +1,12 @@
 #!/usr/bin/env python3
-import os, sys, requests
+import os, sys, re, asyncio, requests
 from datetime import datetime
+from llm_client import LLMClient
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
 
 API_KEY = os.getenv("API_KEY", "")
 API_URL = os.getenv("API_URL", "https://openrouter.ai/api/v1/chat/completions")
@@ -8,25 +14,91 @@ MODEL = os.getenv("MODEL", "deepseek/deepseek-chat")
 TG_BOT_TOKEN = os.getenv("TG_BOT_TOKEN", "")
 TG_CHAT_ID = os.getenv("TG_CHAT_ID", "")
 TICKERS = ["SBER", "GAZP", "LKOH", "SFIN", "MTLR"]
+CONCURRENCY = int(os.getenv("SIGNAL_CONCURRENCY", "5"))
+DEADLINE = float(os.getenv("SIGNAL_DEADLINE", "30"))
+RETRIES = int(os.getenv("SIGNAL_RETRIES", "2"))
+SYSTEM = "MOEX analyst. Reply: BUY/SELL/HOLD confidence"
+BATCH_SYSTEM = "MOEX analyst. For each ticker reply one line: TICKER BUY/SELL/HOLD confidence"
 
 class AITrader:
+    def __init__(self, concurrency=CONCURRENCY, deadline=DEADLINE, retries=RETRIES, batched=False, llm=None):
+        self.llm = llm or LLMClient(API_URL, API_KEY)
+        self.concurrency = concurrency
+        self.deadline = deadline
+        self.retries = retries
+        self.batched = batched
+    
+    def _request(self, system, prompt, max_tokens=50):
+        return {"model": MODEL, "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ], "max_tokens": max_tokens}
+    
     def get_signal(self, ticker):
         try:
-            r = requests.post(API_URL, headers={"Authorization": "Bearer " + API_KEY},
-                json={"model": MODEL, "messages": [
-                    {"role": "system", "content": "MOEX analyst. Reply: BUY/SELL/HOLD confidence"},
-                    {"role": "user", "content": "Analyze " + ticker}
-                ], "max_tokens": 50}, timeout=30)
-            return r.json()["choices"][0]["message"]["content"].strip()
+            data = self.llm.complete(self._request(SYSTEM, "Analyze " + ticker), timeout=self.deadline)
+            return data["choices"][0]["message"]["content"].strip()
         except Exception as e:
             return "ERROR: " + str(e)
     
+    async def _signal_async(self, session, sem, ticker):
+        error = ""
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+            try:
+                async with sem:
+                    data = await self.llm.acomplete(session, self._request(SYSTEM, "Analyze " + ticker),
+                                                    aiohttp.ClientTimeout(total=self.deadline))
+                return data["choices"][0]["message"]["content"].strip()
+            except aiohttp.ClientResponseError as e:
+                if e.status != 429 and e.status < 500:
+                    return "ERROR: HTTP " + str(e.status)
+                error = "HTTP " + str(e.status)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+            except Exception as e:
+                return "ERROR: " + str(e)
+        return "ERROR: " + error
+    
+    async def _signals_async(self, tickers):
+        sem = asyncio.Semaphore(self.concurrency)
+        async with aiohttp.ClientSession() as session:
+            return await asyncio.gather(*[self._signal_async(session, sem, t) for t in tickers])
+    
+    def get_signals_batched(self, tickers):
+        """Один запрос на все тикеры; пропущенные в ответе добираем поштучно"""
+        found = {}
+        try:
+            data = self.llm.complete(self._request(BATCH_SYSTEM, "Analyze: " + ", ".join(tickers), 20 * len(tickers) + 50),
+                                     timeout=self.deadline)
+            text = data["choices"][0]["message"]["content"]
+            for line in text.splitlines():
+                m = re.match(r"^[\W\d]*([A-Z]+)\W+(BUY|SELL|HOLD)\b\W*(.*)$", line.strip(), re.IGNORECASE)
+                if m and m.group(1).upper() in tickers:
+                    found[m.group(1).upper()] = (m.group(2).upper() + " " + m.group(3)).strip()
+        except Exception:
+            pass
+        missing = [t for t in tickers if t not in found]
+        if missing:
+            found.update(self.get_signals(missing, batched=False))
+        return [(t, found[t]) for t in tickers]
+    
+    def get_signals(self, tickers=TICKERS, batched=None):
+        """[(ticker, signal)] — запросы параллельно, время ~ самого медленного"""
+        tickers = list(tickers)
+        if self.batched if batched is None else batched:
+            return self.get_signals_batched(tickers)
+        if aiohttp is None:
+            return [(t, self.get_signal(t)) for t in tickers]
+        return list(zip(tickers, asyncio.run(self._signals_async(tickers))))
+    
     def scan(self):
-        for t in TICKERS:
-            print(t + ": " + self.get_signal(t))
+        for t, s in self.get_signals(TICKERS):
+            print(t + ": " + s)
     
     def alert(self):
-        signals = [(t, self.get_signal(t)) for t in TICKERS]
+        signals = self.get_signals(TICKERS)
         buys = [(t,s) for t,s in signals if "BUY" in s.upper()]
         now = datetime.now().strftime("%d.%m %H:%M")
         msg = "MOEX " + now + " - "
@@ -38,7 +110,7 @@ class AITrader:
         print("Sent: " + msg)
 
 if __name__ == "__main__":
-    t = AITrader()
+    t = AITrader(batched="batch" in sys.argv[1:])
     if len(sys.argv) > 1 and sys.argv[1] == "alert":
         t.alert()
     else:
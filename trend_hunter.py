@@ -1,8 +1,19 @@
 import sqlite3
 from datetime import datetime, timedelta
 from position_sizer import TIER1, TIER2, TIER3
+from price_store import open_store
+import indicators
 
 def get_ma(ticker, days=10):
+    ind = indicators.get(ticker, "sma" + str(days))
+    if ind:
+        value, ready, _ = ind
+        return round(value, 2) if ready else None
+    store = open_store(ticker=ticker)
+    if store is not None:
+        close = store.close(ticker, days)
+        if len(close) < days: return None
+        return round(sum(close[::-1].tolist()) / days, 2)
     try:
         conn = sqlite3.connect("history.db")
         rows = conn.execute("SELECT close FROM prices WHERE ticker=? ORDER BY date DESC LIMIT ?", (ticker, days)).fetchall()